@@ -0,0 +1,318 @@
+"""
+Benchmark suite timing every public function of FairRankTune's Metrics, Rankers, and RankTune over a grid of scales.
+
+Synthetic data for each scale comes from GenFromGroups (and ScoredGenFromGroups for scores), with a fixed seed so runs
+are reproducible. Each case records the best wall time over several repeats and, in a separate run under tracemalloc,
+its peak memory. Results are written as JSON so runs of different versions can be compared.
+
+Usage (from the repository root, PYTHONPATH=src benchmarks the working tree instead of the installed package):
+    python benchmarks/bench.py --out results.json
+    python benchmarks/bench.py --items 100 1000 --rankings 10 --groups 2 --cases EXP ARP
+    python benchmarks/bench.py --out new.json --compare results.json
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from importlib import metadata
+import numpy as np
+import pandas as pd
+import FairRankTune as frt
+
+PHI = 0.5  # representativeness of the generated rankings
+SEED = 0
+
+
+def make_data(num_items, num_rankings, num_groups):
+    """
+    Generate the synthetic data of one scale.
+    :param num_items: Int, number of items in each ranking.
+    :param num_rankings: Int, number of rankings.
+    :param num_groups: Int, number of equally sized groups.
+    :return: Dictionary of inputs shared by the cases.
+    """
+    group_proportions = np.full(num_groups, 1 / num_groups)
+    group_proportions[-1] = 1 - group_proportions[:-1].sum()  # sums to exactly 1
+    ranking_df, item_group_dict, scores_df = frt.RankTune.ScoredGenFromGroups(
+        group_proportions, num_items, PHI, num_rankings, "uniform", SEED
+    )
+    return {
+        "group_proportions": group_proportions,
+        "num_items": len(item_group_dict),
+        "num_rankings": num_rankings,
+        "ranking_df": ranking_df,
+        "item_group_dict": item_group_dict,
+        "scores_df": scores_df,
+        "ctr_df": scores_df * 0.5,
+        "distribution": dict(enumerate(group_proportions)),
+        "shards": [
+            (ranking_df.iloc[:, i : i + 10], scores_df.iloc[:, i : i + 10])
+            for i in range(0, num_rankings, 10)
+        ],
+    }
+
+
+def _accumulate(d):
+    accumulator = frt.Metrics.MetricAccumulator("EXP", d["item_group_dict"])
+    for start in range(0, d["num_rankings"], 10):
+        accumulator.update(d["ranking_df"].iloc[:, start : start + 10])
+    return accumulator.result("MinMaxRatio")
+
+
+def _window(d):
+    windowed = frt.Metrics.WindowedMetric("EXP", d["item_group_dict"], window=10)
+    windowed.update(d["ranking_df"])
+    return windowed.result("MinMaxRatio")
+
+
+def _iter_gen(d):
+    for _ in frt.RankTune.IterGenFromItems(
+        d["item_group_dict"], PHI, d["num_rankings"], SEED, chunk=10
+    ):
+        pass
+
+
+# name -> function of the scale's data, one case per public function
+CASES = {
+    # Metrics
+    "EXP": lambda d: frt.Metrics.EXP(
+        d["ranking_df"], d["item_group_dict"], "MinMaxRatio"
+    ),
+    "EXPU": lambda d: frt.Metrics.EXPU(
+        d["ranking_df"], d["item_group_dict"], d["scores_df"], "MinMaxRatio"
+    ),
+    "EXPRU": lambda d: frt.Metrics.EXPRU(
+        d["ranking_df"],
+        d["item_group_dict"],
+        d["scores_df"],
+        d["ctr_df"],
+        "MinMaxRatio",
+    ),
+    "AWRF": lambda d: frt.Metrics.AWRF(
+        d["ranking_df"], d["item_group_dict"], 0.1, "MinMaxRatio"
+    ),
+    "ERBE": lambda d: frt.Metrics.ERBE(
+        d["ranking_df"], d["item_group_dict"], 0.5, "MinMaxRatio"
+    ),
+    "ERBP": lambda d: frt.Metrics.ERBP(
+        d["ranking_df"], d["item_group_dict"], 0.5, "MinMaxRatio"
+    ),
+    "ERBR": lambda d: frt.Metrics.ERBR(
+        d["ranking_df"], d["item_group_dict"], d["scores_df"], 0.5, "MinMaxRatio"
+    ),
+    "ARP": lambda d: frt.Metrics.ARP(
+        d["ranking_df"], d["item_group_dict"], "MinMaxRatio"
+    ),
+    "NDKL": lambda d: frt.Metrics.NDKL(d["ranking_df"][[0]], d["item_group_dict"]),
+    "NDKLBatch": lambda d: frt.Metrics.NDKLBatch(d["ranking_df"], d["item_group_dict"]),
+    "IAA": lambda d: frt.Metrics.IAA(d["ranking_df"][[0]], d["scores_df"][[0]]),
+    "Evaluate": lambda d: frt.Metrics.Evaluate(
+        d["ranking_df"],
+        d["item_group_dict"],
+        ["EXP", "EXPU", "AWRF", "ERBE", "ERBP", "ARP"],
+        ["MinMaxRatio", "MaxAbsDiff"],
+        relevance_df=d["scores_df"],
+        p=0.1,
+        decay=0.5,
+    ),
+    "EvaluateShards": lambda d: frt.Metrics.EvaluateShards(
+        d["shards"], d["item_group_dict"], ["EXP", "EXPU"], ["MinMaxRatio"]
+    ),
+    "Bootstrap": lambda d: frt.Metrics.Bootstrap(
+        d["ranking_df"], d["item_group_dict"], "EXP", "MinMaxRatio", 200, seed=SEED
+    ),
+    "MetricAccumulator": _accumulate,
+    "WindowedMetric": _window,
+    # Rankers
+    "DETCONSTSORT": lambda d: frt.Rankers.DETCONSTSORT(
+        d["ranking_df"][[0]],
+        d["item_group_dict"],
+        d["scores_df"][[0]],
+        d["distribution"],
+        d["num_items"],
+    ),
+    "DETCONSTSORTBatch": lambda d: frt.Rankers.DETCONSTSORTBatch(
+        d["ranking_df"],
+        d["item_group_dict"],
+        d["scores_df"],
+        d["distribution"],
+        d["num_items"],
+    ),
+    "EPSILONGREEDY": lambda d: frt.Rankers.EPSILONGREEDY(
+        d["ranking_df"][[0]], d["item_group_dict"], d["scores_df"][[0]], 0.3, SEED
+    ),
+    "EPSILONGREEDYBatch": lambda d: frt.Rankers.EPSILONGREEDYBatch(
+        d["ranking_df"], d["item_group_dict"], d["scores_df"], 0.3, SEED
+    ),
+    # RankTune
+    "GenFromGroups": lambda d: frt.RankTune.GenFromGroups(
+        d["group_proportions"], d["num_items"], PHI, d["num_rankings"], SEED
+    ),
+    "ScoredGenFromGroups": lambda d: frt.RankTune.ScoredGenFromGroups(
+        d["group_proportions"], d["num_items"], PHI, d["num_rankings"], "uniform", SEED
+    ),
+    "GenFromItems": lambda d: frt.RankTune.GenFromItems(
+        d["item_group_dict"], PHI, d["num_rankings"], SEED
+    ),
+    "ScoredGenFromItems": lambda d: frt.RankTune.ScoredGenFromItems(
+        d["item_group_dict"], PHI, d["num_rankings"], "normal", SEED
+    ),
+    "IterGenFromItems": _iter_gen,
+}
+
+
+def measure(fn, data, repeat):
+    """
+    Time a case and measure its peak memory.
+    :param fn: Function of the scale's data.
+    :param data: Dictionary of inputs.
+    :param repeat: Int, number of timed runs.
+    :return: Best wall time in seconds, median wall time in seconds, peak traced memory in bytes.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(data)
+        times.append(time.perf_counter() - start)
+    # tracing slows allocations down, so memory is measured in a run of its own
+    tracemalloc.start()
+    fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), float(np.median(times)), peak
+
+
+def available(name):
+    """
+    Whether the benchmarked package has the public function a case is named after (older versions lack some).
+    :param name: String, case name.
+    :return: Bool.
+    """
+    return any(
+        hasattr(module, name) for module in (frt.Metrics, frt.Rankers, frt.RankTune)
+    )
+
+
+def run(items, rankings, groups, cases, repeat, log=sys.stderr):
+    """
+    Run the cases over the grid of scales.
+    :param items: List of Ints, numbers of items.
+    :param rankings: List of Ints, numbers of rankings.
+    :param groups: List of Ints, numbers of groups.
+    :param cases: List of case names, cases the benchmarked package does not have are skipped.
+    :param repeat: Int, number of timed runs of each case.
+    :param log: File progress is printed to.
+    :return: List of result dictionaries, one per case and scale.
+    """
+    for name in cases:
+        if not available(name):
+            print("%-20s skipped, not in the benchmarked package" % name, file=log)
+    cases = [name for name in cases if available(name)]
+    results = []
+    for num_items in items:
+        for num_rankings in rankings:
+            for num_groups in groups:
+                data = make_data(num_items, num_rankings, num_groups)
+                for name in cases:
+                    best, median, peak = measure(CASES[name], data, repeat)
+                    results.append(
+                        {
+                            "case": name,
+                            "items": num_items,
+                            "rankings": num_rankings,
+                            "groups": num_groups,
+                            "best_seconds": best,
+                            "median_seconds": median,
+                            "peak_bytes": peak,
+                        }
+                    )
+                    print(
+                        "%-20s items=%-6d rankings=%-6d groups=%-3d %10.6fs %12d B"
+                        % (name, num_items, num_rankings, num_groups, best, peak),
+                        file=log,
+                    )
+    return results
+
+
+def environment():
+    """
+    Versions of the benchmarked package and its environment.
+    :return: Dictionary.
+    """
+    try:
+        version = metadata.version("FairRankTune")
+    except metadata.PackageNotFoundError:
+        version = None
+    return {
+        "FairRankTune": version,
+        "FairRankTune_path": frt.__path__[0],  # tells a working tree from an install
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def compare(results, baseline):
+    """
+    Print the time and memory ratios of results against a baseline run, for the cases and scales both ran.
+    :param results: List of result dictionaries.
+    :param baseline: List of result dictionaries.
+    :return: None.
+    """
+
+    def key(r):
+        return r["case"], r["items"], r["rankings"], r["groups"]
+
+    base = {key(r): r for r in baseline}
+    print("%-20s %-22s %10s %10s" % ("case", "items/rankings/groups", "time", "memory"))
+    for r in results:
+        b = base.get(key(r))
+        if b is None:
+            continue
+        print(
+            "%-20s %-22s %9.2fx %9.2fx"
+            % (
+                r["case"],
+                "%d/%d/%d" % key(r)[1:],
+                r["best_seconds"] / b["best_seconds"],
+                r["peak_bytes"] / max(b["peak_bytes"], 1),
+            )
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--rankings", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--groups", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--cases", nargs="+", default=list(CASES), choices=list(CASES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="JSON file to write the results to")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare to")
+    args = parser.parse_args(argv)
+
+    results = run(args.items, args.rankings, args.groups, args.cases, args.repeat)
+    report = {
+        "environment": environment(),
+        "grid": {"items": args.items, "rankings": args.rankings, "groups": args.groups},
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)["results"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import numpy as np
+from FairRankTune.Data.GroupIndex import GroupIndex
+from FairRankTune.Data.RaggedRankings import RaggedRankings
+from FairRankTune.Data.BlockUtil import _ragged
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency, only needed by the functions of this script
+    pa = None
+    pq = None
+
+# Script containing readers and writers of ranking(s) as long-format Arrow tables and Parquet files.
+# Each row is one ranked position: ranking_id, position (0 is the top), item_id, and optionally score (e.g., relevance)
+# and group. The rows of a ranking are contiguous, so files are read batch by batch into RaggedRankings without ever
+# pivoting to a wide dataframe.
+
+__BATCH_ROWS = 2**20  # rows read per Parquet record batch by default
+
+
+def ToArrow(ranking_df, relevance_df=None, item_group_dict=None, first_ranking_id=0):
+    """
+    Convert ranking(s) (e.g., the outputs of the Gen* functions) to a long-format Arrow table.
+    :param ranking_df: Pandas dataframe, Numpy array, or RaggedRankings of ranking(s).
+    :param relevance_df: Optional relevance scores associated with each item in ranking(s), stored as score.
+    :param item_group_dict: Optional dictionary of items (keys) and their group membership (values), or a GroupIndex, stored as group.
+    :param first_ranking_id: Int, ranking_id of the first ranking.
+    :return: Pyarrow table with columns ranking_id, position, item_id, and score and group if given.
+    """
+    __check_arrow()
+    rankings = _ragged(ranking_df, None)
+    lengths = rankings.lengths
+    starts = np.repeat(rankings.offsets[:-1], lengths)
+    columns = {
+        "ranking_id": np.repeat(
+            np.arange(first_ranking_id, first_ranking_id + len(rankings)), lengths
+        ),
+        "position": (np.arange(len(rankings.items)) - starts).astype(np.int32),
+        "item_id": rankings.items,
+    }
+    if relevance_df is not None:
+        scores = _ragged(relevance_df, lengths)
+        if not np.array_equal(scores.lengths, lengths):
+            raise ValueError("Please input relevance_df aligned with the ranking(s)")
+        columns["score"] = scores.items
+    if item_group_dict is not None:
+        index = GroupIndex(item_group_dict)
+        columns["group"] = index.groups[index.item_codes(rankings.items)]
+    return pa.table(columns)
+
+
+def FromArrow(data):
+    """
+    Read ranking(s) from a long-format Arrow table (or record batch), without building a wide dataframe.
+    :param data: Pyarrow table or record batch with columns ranking_id, position, item_id, and optionally score.
+    :return: RaggedRankings of items, RaggedRankings of scores (None without a score column), both with one ranking per ranking_id in increasing order.
+    """
+    __check_arrow()
+    return __from_columns(__columns(data))
+
+
+def ItemGroupsFromArrow(data):
+    """
+    Read the item_group_dict from the item_id and group columns of a long-format Arrow table (or record batch).
+    :param data: Pyarrow table or record batch.
+    :return: Dictionary of items (keys) and their group membership (values).
+    """
+    __check_arrow()
+    items = np.asarray(data.column("item_id"))
+    groups = np.asarray(data.column("group"))
+    _, first = np.unique(items, return_index=True)  # items repeat across rankings
+    return dict(zip(items[first].tolist(), groups[first].tolist()))
+
+
+def WriteParquet(path, ranking_df, relevance_df=None, item_group_dict=None):
+    """
+    Write ranking(s) (e.g., the outputs of the Gen* functions) to a long-format Parquet file.
+    :param path: String, path of the Parquet file.
+    :param ranking_df: Pandas dataframe, Numpy array, or RaggedRankings of ranking(s).
+    :param relevance_df: Optional relevance scores associated with each item in ranking(s), stored as score.
+    :param item_group_dict: Optional dictionary of items (keys) and their group membership (values), or a GroupIndex, stored as group.
+    :return: None.
+    """
+    WriteParquetBlocks(path, [(ranking_df, relevance_df)], item_group_dict)
+
+
+def WriteParquetBlocks(path, blocks, item_group_dict=None):
+    """
+    Write blocks of ranking(s) (e.g., from IterGenFromItems) to a long-format Parquet file, one row group per block.
+    :param path: String, path of the Parquet file.
+    :param blocks: Iterable of ranking_df, or of tuples (ranking_df, relevance_df), ranking_ids continue from block to block.
+    :param item_group_dict: Optional dictionary of items (keys) and their group membership (values), or a GroupIndex, stored as group.
+    :return: None.
+    """
+    __check_arrow()
+    if item_group_dict is not None:
+        item_group_dict = GroupIndex(item_group_dict)  # built once for all blocks
+    writer = None
+    next_ranking_id = 0
+    try:
+        for block in blocks:
+            if not isinstance(block, tuple):
+                block = (block,)
+            table = ToArrow(*block[:2], item_group_dict, next_ranking_id)
+            next_ranking_id += len(_ragged(block[0], None))
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def ReadParquet(path):
+    """
+    Read all ranking(s) of a long-format Parquet file, e.g., as a loader of a shard for EvaluateShards.
+    :param path: String, path of the Parquet file.
+    :return: RaggedRankings of items, RaggedRankings of scores (None without a score column).
+    """
+    __check_arrow()
+    return FromArrow(pq.read_table(path, columns=__ranking_columns(path)))
+
+
+def IterParquet(path, batch_size=__BATCH_ROWS):
+    """
+    Read a long-format Parquet file in record batches of whole rankings, holding about one batch in memory.
+    The rows of each ranking must be contiguous in the file (as written by WriteParquet and WriteParquetBlocks).
+    :param path: String, path of the Parquet file.
+    :param batch_size: Int, rows per record batch.
+    :return: Generator of tuples (RaggedRankings of items, RaggedRankings of scores or None), e.g., the shards of EvaluateShards or the blocks of a MetricAccumulator.
+    """
+    __check_arrow()
+    parquet_file = pq.ParquetFile(path)
+    pending = None
+    for batch in parquet_file.iter_batches(
+        batch_size=batch_size, columns=__ranking_columns(path)
+    ):
+        columns = __columns(batch)
+        if pending is not None:
+            columns = {c: np.concatenate((pending[c], columns[c])) for c in columns}
+        if len(columns["ranking_id"]) == 0:
+            continue
+        # the last ranking of the batch may continue in the next one
+        earlier = np.flatnonzero(columns["ranking_id"] != columns["ranking_id"][-1])
+        last_start = earlier[-1] + 1 if len(earlier) else 0
+        pending = {c: values[last_start:] for c, values in columns.items()}
+        if last_start > 0:
+            yield __from_columns(
+                {c: values[:last_start] for c, values in columns.items()}
+            )
+    if pending is not None and len(pending["ranking_id"]):
+        yield __from_columns(pending)
+
+
+def ReadItemGroups(path):
+    """
+    Read the item_group_dict from the item_id and group columns of a long-format Parquet file.
+    :param path: String, path of the Parquet file.
+    :return: Dictionary of items (keys) and their group membership (values).
+    """
+    __check_arrow()
+    return ItemGroupsFromArrow(pq.read_table(path, columns=["item_id", "group"]))
+
+
+def __check_arrow():
+    """
+    Function to error check that the optional pyarrow dependency is installed.
+    :return: Raise error if appropriate.
+    """
+    if pa is None:
+        raise ImportError(
+            "Please install pyarrow (pip install FairRankTune[arrow]) to read and write Arrow tables and Parquet files"
+        )
+
+
+def __ranking_columns(path):
+    """
+    Columns of a long-format Parquet file needed to read its ranking(s).
+    :param path: String, path of the Parquet file.
+    :return: List of column names.
+    """
+    names = pq.read_schema(path).names
+    return ["ranking_id", "position", "item_id"] + (
+        ["score"] if "score" in names else []
+    )
+
+
+def __columns(data):
+    """
+    Read the ranking columns of an Arrow table or record batch as Numpy arrays.
+    :param data: Pyarrow table or record batch.
+    :return: Dictionary of Numpy arrays (column names are keys).
+    """
+    names = ["ranking_id", "position", "item_id"]
+    if "score" in data.schema.names:
+        names.append("score")
+    return {name: np.asarray(data.column(name)) for name in names}
+
+
+def __from_columns(columns):
+    """
+    Build RaggedRankings from long-format columns.
+    :param columns: Dictionary of Numpy arrays of ranking_id, position, item_id, and optionally score.
+    :return: RaggedRankings of items, RaggedRankings of scores or None.
+    """
+    ranking_ids = columns["ranking_id"]
+    positions = columns["position"]
+    # rows written by this script are already in order, others are sorted by ranking and position
+    if len(ranking_ids) > 1 and not np.all(
+        (ranking_ids[1:] > ranking_ids[:-1])
+        | ((ranking_ids[1:] == ranking_ids[:-1]) & (positions[1:] > positions[:-1]))
+    ):
+        order = np.lexsort((positions, ranking_ids))
+        columns = {c: values[order] for c, values in columns.items()}
+        ranking_ids = columns["ranking_id"]
+    starts = np.flatnonzero(np.diff(ranking_ids)) + 1
+    offsets = np.concatenate(([0], starts, [len(ranking_ids)])).astype(np.int64)
+    if len(ranking_ids) == 0:
+        offsets = offsets[:1]
+    rankings = RaggedRankings(columns["item_id"], offsets)
+    scores = RaggedRankings(columns["score"], offsets) if "score" in columns else None
+    return rankings, scores
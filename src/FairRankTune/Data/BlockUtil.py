@@ -0,0 +1,21 @@
+import numpy as np
+from FairRankTune.Data.RaggedRankings import RaggedRankings
+
+# Script containing methods shared by the readers and writers of blocks of ranking(s) (RankingStore and ArrowIO).
+# RankingStoreWriter calls them from its class body, where a dunder name would be mangled, hence the single underscore.
+
+
+def _ragged(values, lengths):
+    """
+    Read a block of ranking(s) (or of values aligned with them) as RaggedRankings.
+    :param values: Pandas dataframe, Numpy array, or RaggedRankings.
+    :param lengths: Numpy array of ranking lengths to align values with, or None to drop padding.
+    :return: RaggedRankings.
+    """
+    if isinstance(values, RaggedRankings):
+        return values
+    if hasattr(values, "to_numpy"):
+        values = values.to_numpy()
+    # keep the values' own dtype, the caller casts them
+    dtype = np.asarray(values).dtype if lengths is not None else None
+    return RaggedRankings.from_array(values, lengths, dtype)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+# Script containing the GroupIndex, a reusable item to group mapping shared by the metrics, rankers, and RankTune.
+
+
+class GroupIndex:
+    """
+    Index of items and their group membership, built once and reused across metric and ranker calls.
+    Items are mapped to contiguous integer group codes, where code c refers to groups[c].
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or an existing GroupIndex.
+    """
+
+    def __init__(self, item_group_dict):
+        if isinstance(item_group_dict, GroupIndex):  # share the already built arrays
+            self.items = item_group_dict.items
+            self.codes = item_group_dict.codes
+            self.groups = item_group_dict.groups
+            self.group_counts = item_group_dict.group_counts
+            self._lookup = item_group_dict._lookup
+            return
+        self._lookup = pd.Index(list(item_group_dict.keys()))
+        self.items = self._lookup.to_numpy()
+        self.groups, self.codes, self.group_counts = np.unique(
+            list(item_group_dict.values()), return_inverse=True, return_counts=True
+        )
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def num_groups(self):
+        """
+        Number of distinct groups.
+        :return: Int.
+        """
+        return len(self.groups)
+
+    def item_positions(self, items):
+        """
+        Locate items in the index.
+        :param items: Array-like of items.
+        :return: Numpy array of each item's position in GroupIndex.items.
+        """
+        positions = self._lookup.get_indexer(np.asarray(items).ravel())
+        if np.any(positions < 0):
+            raise KeyError(np.asarray(items).ravel()[np.argmax(positions < 0)])
+        return positions.reshape(np.shape(items))
+
+    def item_codes(self, items):
+        """
+        Map items to their integer group codes.
+        :param items: Array-like of items.
+        :return: Numpy array of group codes.
+        """
+        return self.codes[self.item_positions(items)]
+
+    def group_of(self, items):
+        """
+        Map items to their group membership.
+        :param items: Array-like of items.
+        :return: Numpy array of groups.
+        """
+        return self.groups[self.item_codes(items)]
+
+    def to_dict(self):
+        """
+        Convert the index back to an item_group_dict.
+        :return: Dictionary of items (keys) and their group membership (values).
+        """
+        return dict(zip(self.items.tolist(), self.groups[self.codes].tolist()))
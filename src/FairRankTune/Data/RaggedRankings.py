@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+# Script containing RaggedRankings, a compact CSR-style container of rankings of different lengths.
+
+
+class RaggedRankings:
+    """
+    Ranking(s) of different lengths stored as one flat array of items and an array of offsets, ranking r is
+    items[offsets[r]:offsets[r + 1]]. It can also hold values aligned with ranking(s) (e.g., relevance scores).
+    RaggedRankings can be passed to the metrics and rankers anywhere a ranking_df (or relevance_df, ctr_df) is accepted.
+    :param items: Array-like of the items of all rankings, concatenated ranking after ranking.
+    :param offsets: Array-like of len(rankings) + 1 offsets into items, starting at 0 and ending at len(items).
+    """
+
+    def __init__(self, items, offsets):
+        self.items = np.asarray(items)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if (
+            self.items.ndim != 1
+            or self.offsets.ndim != 1
+            or len(self.offsets) == 0
+            or self.offsets[0] != 0
+            or self.offsets[-1] != len(self.items)
+            or np.any(np.diff(self.offsets) < 0)
+        ):
+            raise ValueError(
+                "Please input 1-D items and non-decreasing offsets from 0 to len(items)"
+            )
+
+    @classmethod
+    def from_lists(cls, rankings, dtype=None):
+        """
+        Build from a list of rankings.
+        :param rankings: List of array-likes, one per ranking.
+        :param dtype: Optional Numpy dtype of the items, default infers int32 for integer items.
+        :return: RaggedRankings.
+        """
+        lengths = [len(ranking) for ranking in rankings]
+        offsets = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+        if len(rankings) == 0:
+            return cls(np.empty(0, dtype=dtype or np.int32), offsets)
+        items = np.concatenate([np.asarray(ranking) for ranking in rankings])
+        return cls(cls.__compact(items, dtype), offsets)
+
+    @classmethod
+    def from_array(cls, array, lengths=None, dtype=None):
+        """
+        Build from a Numpy array laid out like ranking_df (positions x rankings).
+        :param array: Numpy array of ranking(s), one per column (or a 1-D single ranking).
+        :param lengths: Optional array-like of ranking lengths, default drops padding (NaN, or -1 in signed integer arrays).
+        :param dtype: Optional Numpy dtype of the items, default infers int32 for integer items.
+        :return: RaggedRankings.
+        """
+        values = np.asarray(array)
+        values = (
+            values[None, :] if values.ndim == 1 else values.T
+        )  # one ranking per row
+        if lengths is not None:
+            lengths = np.asarray(lengths, dtype=np.int64)
+            valid = np.arange(values.shape[1])[None, :] < lengths[:, None]
+        elif values.dtype.kind == "i":
+            valid = values != -1
+        else:
+            valid = ~pd.isnull(values)
+        offsets = np.concatenate(([0], np.cumsum(valid.sum(axis=1), dtype=np.int64)))
+        return cls(cls.__compact(values[valid], dtype), offsets)
+
+    @classmethod
+    def from_df(cls, ranking_df, dtype=None):
+        """
+        Build from a Pandas dataframe of ranking(s) padded with NaN.
+        :param ranking_df: Pandas dataframe of ranking(s).
+        :param dtype: Optional Numpy dtype of the items, default infers int32 for integer items (including integral floats, so pass e.g. np.float32 to keep relevance scores as floats).
+        :return: RaggedRankings.
+        """
+        return cls.from_array(ranking_df.to_numpy(), dtype=dtype)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, r):
+        return self.items[self.offsets[r] : self.offsets[r + 1]]
+
+    @property
+    def lengths(self):
+        """
+        Length of each ranking.
+        :return: Numpy array of ints.
+        """
+        return np.diff(self.offsets)
+
+    def to_array(self):
+        """
+        Convert to a padded Numpy array laid out like ranking_df (positions x rankings).
+        Padding is -1 for signed integer items, NaN for floating point items, else None.
+        :return: Numpy array.
+        """
+        lengths = self.lengths
+        items = self.items
+        if items.dtype.kind == "u":
+            items = items.astype(np.int64)
+        if items.dtype.kind == "i":
+            pad = -1
+        elif items.dtype.kind == "f":
+            pad = np.nan
+        else:
+            items = items.astype(object)
+            pad = None
+        array = np.full((len(self), lengths.max(initial=0)), pad, dtype=items.dtype)
+        array[np.arange(array.shape[1])[None, :] < lengths[:, None]] = items
+        return array.T
+
+    def to_df(self):
+        """
+        Convert to a Pandas dataframe of ranking(s) padded with NaN.
+        :return: Pandas dataframe.
+        """
+        if len(self) == 0:
+            return pd.DataFrame()
+        if np.all(self.lengths == self.lengths[0]):  # no padding needed
+            return pd.DataFrame(self.items.reshape(len(self), -1).T)
+        items = self.items
+        if items.dtype.kind in "iu":
+            items = items.astype(np.float64)
+        return pd.DataFrame(RaggedRankings(items, self.offsets).to_array())
+
+    @staticmethod
+    def __compact(items, dtype):
+        """
+        Store items compactly, integer (or integral floating point) items become int32 when they fit.
+        :param items: Numpy array of items.
+        :param dtype: Numpy dtype to use, or None to infer.
+        :return: Numpy array.
+        """
+        if dtype is not None:
+            return items.astype(dtype)
+        if items.dtype.kind == "O":
+            if not all(isinstance(item, (int, np.integer)) for item in items):
+                return items
+            items = items.astype(np.int64)
+        if items.dtype.kind == "f":
+            if not np.all(np.isfinite(items)) or np.any(items != np.round(items)):
+                return items
+        if items.dtype.kind in "iuf":
+            if len(items) == 0 or (
+                items.min() >= np.iinfo(np.int32).min
+                and items.max() <= np.iinfo(np.int32).max
+            ):
+                return items.astype(np.int32)
+            return items.astype(np.int64)
+        return items
@@ -0,0 +1,244 @@
+import json
+import os
+import numpy as np
+from FairRankTune.Data.RaggedRankings import RaggedRankings
+from FairRankTune.Data.BlockUtil import _ragged
+
+# Script containing RankingStore, an on-disk binary format of ranking(s) read through memory maps.
+# A store is a directory of raw little-endian arrays: items.bin (int32 item ids of all rankings, concatenated),
+# offsets.bin (int64, len(rankings) + 1 offsets into items), and optionally relevance.bin and ctr.bin (float32, aligned
+# with items), described by store.json (which records the dtype of each array).
+
+
+class RankingStore:
+    """
+    Ranking(s) stored on disk and memory-mapped, so very large collections can be audited in bounded memory.
+    Chunks of the store are RaggedRankings viewing the mapped files (no copy), and can be passed to the metrics and rankers.
+    A RankingStore can also be passed to Evaluate, which reads it chunk by chunk.
+    :param path: String, directory of the store.
+    """
+
+    __META = "store.json"
+    __CHUNK_POSITIONS = 2**22  # ranked positions per chunk read by default
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, self.__META)) as f:
+            meta = json.load(f)
+        self.num_positions = meta["num_positions"]
+        lengths = {
+            "offsets": meta["num_rankings"] + 1,
+            "items": self.num_positions,
+            "relevance": self.num_positions,
+            "ctr": self.num_positions,
+        }
+        arrays = {
+            name: self.__map(path, name, np.dtype(dtype), lengths[name])
+            for name, dtype in meta["dtypes"].items()
+        }
+        self.offsets = arrays["offsets"]
+        self.items = arrays["items"]
+        self.relevance = arrays.get("relevance")
+        self.ctr = arrays.get("ctr")
+
+    @classmethod
+    def write(cls, path, ranking_df, relevance_df=None, ctr_df=None):
+        """
+        Write ranking(s) (e.g., the outputs of the Gen* functions) to a new store.
+        :param path: String, directory of the store, created if needed.
+        :param ranking_df: Pandas dataframe, Numpy array, or RaggedRankings of ranking(s) of integer item ids.
+        :param relevance_df: Optional relevance scores associated with each item in ranking(s).
+        :param ctr_df: Optional click-through-rates associated with each item in ranking(s).
+        :return: RankingStore.
+        """
+        return cls.write_blocks(path, [(ranking_df, relevance_df, ctr_df)])
+
+    @classmethod
+    def write_blocks(cls, path, blocks):
+        """
+        Write blocks of ranking(s) to a new store one block at a time, e.g., from IterGenFromItems.
+        :param path: String, directory of the store, created if needed.
+        :param blocks: Iterable of ranking_df, or of tuples (ranking_df, relevance_df, ctr_df) (trailing entries can be left out).
+        :return: RankingStore.
+        """
+        with RankingStoreWriter(path) as writer:
+            for block in blocks:
+                if not isinstance(block, tuple):
+                    block = (block,)
+                writer.append(*block)
+        return cls(path)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self):
+        """
+        Length of each ranking.
+        :return: Numpy array of ints.
+        """
+        return np.diff(self.offsets)
+
+    def rankings(self, start=0, stop=None):
+        """
+        Ranking(s) start to stop (exclusive) as RaggedRankings viewing the store.
+        :param start: Int, first ranking.
+        :param stop: Int, end of the rankings, default is the last ranking.
+        :return: RaggedRankings of items, RaggedRankings of relevance scores or None, RaggedRankings of click-through-rates or None.
+        """
+        stop = len(self) if stop is None else stop
+        offsets = np.asarray(self.offsets[start : stop + 1])
+        positions = slice(offsets[0], offsets[-1])
+        offsets = offsets - offsets[0]
+        return tuple(
+            None if values is None else RaggedRankings(values[positions], offsets)
+            for values in (self.items, self.relevance, self.ctr)
+        )
+
+    def chunks(self, max_positions=__CHUNK_POSITIONS):
+        """
+        Read the store in chunks of whole rankings.
+        :param max_positions: Int, most ranked positions per chunk (a longer ranking is a chunk of its own).
+        :return: Generator of tuples of RaggedRankings (items, relevance scores or None, click-through-rates or None), like the shards of EvaluateShards.
+        """
+        offsets = np.asarray(self.offsets)
+        start = 0
+        while start < len(self):
+            stop = np.searchsorted(offsets, offsets[start] + max_positions, "right") - 1
+            stop = max(int(stop), start + 1)
+            yield self.rankings(start, stop)
+            start = stop
+
+    @staticmethod
+    def __map(path, name, dtype, length):
+        """
+        Memory-map one array of a store read-only.
+        :param path: String, directory of the store.
+        :param name: String, one of "items", "offsets", "relevance", and "ctr".
+        :param dtype: Numpy dtype of the array.
+        :param length: Int, number of values.
+        :return: Numpy memmap (or an empty array, as empty files can't be mapped).
+        """
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(
+            os.path.join(path, name + ".bin"), dtype=dtype, mode="r", shape=length
+        )
+
+
+class RankingStoreWriter:
+    """
+    Writer appending blocks of ranking(s) to a new RankingStore, holding only one block in memory.
+    Relevance scores and click-through-rates are stored if the first block has them, and then every block must.
+    Use as a context manager, or call close() to finish the store. A store whose writing raised an exception inside the
+    context manager is left without its description, so it can't be opened.
+    :param path: String, directory of the store, created if needed.
+    """
+
+    __META = "store.json"
+    __DTYPES = {
+        "items": np.dtype("<i4"),
+        "offsets": np.dtype("<i8"),
+        "relevance": np.dtype("<f4"),
+        "ctr": np.dtype("<f4"),
+    }
+
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.num_rankings = 0
+        self.num_positions = 0
+        self.files = {"items": open(os.path.join(path, "items.bin"), "wb")}
+        self.files["offsets"] = open(os.path.join(path, "offsets.bin"), "wb")
+        self.files["offsets"].write(
+            np.zeros(1, dtype=self.__DTYPES["offsets"]).tobytes()
+        )
+        self.columns = None  # optional columns stored, set by the first block
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+            return
+        # the blocks written so far are incomplete, drop the description (possibly of an earlier store)
+        self.__close_files()
+        if os.path.exists(os.path.join(self.path, self.__META)):
+            os.remove(os.path.join(self.path, self.__META))
+
+    def append(self, ranking_df, relevance_df=None, ctr_df=None):
+        """
+        Append a block of ranking(s).
+        :param ranking_df: Pandas dataframe, Numpy array, or RaggedRankings of ranking(s) of integer item ids.
+        :param relevance_df: Relevance scores associated with each item in ranking(s), or None.
+        :param ctr_df: Click-through-rates associated with each item in ranking(s), or None.
+        :return: The writer.
+        """
+        values = {"relevance": relevance_df, "ctr": ctr_df}
+        if self.columns is None:
+            self.columns = [c for c in values if values[c] is not None]
+            for column in self.columns:
+                self.files[column] = open(
+                    os.path.join(self.path, column + ".bin"), "wb"
+                )
+        if [c for c in values if values[c] is not None] != self.columns:
+            raise ValueError(
+                "Please input the same relevance_df and ctr_df columns in every block"
+            )
+
+        rankings = _ragged(ranking_df, None)
+        items = rankings.items
+        if items.dtype.kind not in "iu" or (
+            len(items)
+            and (
+                items.min() < np.iinfo(np.int32).min
+                or items.max() > np.iinfo(np.int32).max
+            )
+        ):
+            raise ValueError("Please input integer item ids that fit in int32")
+        self.files["items"].write(items.astype(self.__DTYPES["items"]).tobytes())
+        offsets = rankings.offsets[1:] + self.num_positions
+        self.files["offsets"].write(offsets.astype(self.__DTYPES["offsets"]).tobytes())
+        for column in self.columns:
+            column_values = _ragged(values[column], rankings.lengths)
+            if not np.array_equal(column_values.lengths, rankings.lengths):
+                raise ValueError(
+                    "Please input " + column + " aligned with the ranking(s)"
+                )
+            self.files[column].write(
+                column_values.items.astype(self.__DTYPES[column]).tobytes()
+            )
+        self.num_rankings += len(rankings)
+        self.num_positions += len(items)
+        return self
+
+    def close(self):
+        """
+        Finish the store, writing its description.
+        :return: None.
+        """
+        self.__close_files()
+        columns = self.columns or []
+        for column in ("relevance", "ctr"):
+            if column not in columns and os.path.exists(
+                os.path.join(self.path, column + ".bin")
+            ):
+                os.remove(os.path.join(self.path, column + ".bin"))
+        meta = {
+            "num_rankings": self.num_rankings,
+            "num_positions": self.num_positions,
+            "dtypes": {
+                name: self.__DTYPES[name].str for name in ["items", "offsets"] + columns
+            },
+        }
+        with open(os.path.join(self.path, self.__META), "w") as f:
+            json.dump(meta, f)
+
+    def __close_files(self):
+        """
+        Close the files of the store's arrays.
+        :return: None.
+        """
+        for f in self.files.values():
+            f.close()
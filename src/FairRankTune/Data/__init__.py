@@ -0,0 +1,4 @@
+from FairRankTune.Data.GroupIndex import *
+from FairRankTune.Data.RaggedRankings import *
+from FairRankTune.Data.RankingStore import *
+from FairRankTune.Data.ArrowIO import *
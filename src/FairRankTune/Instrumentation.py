@@ -0,0 +1,191 @@
+import sys
+import threading
+import time
+import tracemalloc
+from contextvars import ContextVar
+from functools import wraps
+import numpy as np
+import pandas as pd
+from FairRankTune.Data.RaggedRankings import RaggedRankings
+from FairRankTune.Data.RankingStore import RankingStore
+
+# Script containing opt-in instrumentation of the metric and ranker calls.
+# Public metric and ranker functions are wrapped by __instrumented, and the shared helpers doing each phase of a call
+# (decoding, mapping items to groups, building weight curves, group sums, reranking, aggregating) by __phase. While no
+# Instrument is active both wrappers only read one context variable and call straight through.
+
+# stack of the records of the calls in progress in each thread
+__local = threading.local()
+
+
+class Instrument:
+    """
+    Context manager recording each call of the metrics and rankers made inside it, in the same thread (or asyncio
+    task): the wall time of the call and of its phases, the size of its input, and its allocations. Each record is a
+    dictionary with keys "function", "seconds", "rankings", "positions" (ranked positions, not counting padding),
+    "phases" (phase names are keys, seconds are values), "phase_calls", "python_blocks" (net number of memory blocks
+    allocated by Python objects, Numpy data buffers are not included), and, for outermost calls if memory is True,
+    "allocated_bytes" (net bytes allocated, including Numpy data buffers) and "peak_bytes" (None otherwise).
+    :param callback: Optional function called with each record as soon as its call returns (e.g., to forward it to a metrics system).
+    :param memory: Bool, also trace the bytes allocated by calls with tracemalloc (which slows allocations down).
+    :param keep: Bool, keep the records in the records attribute.
+    """
+
+    # sessions active in the current context, every record is reported to all of them
+    _active = ContextVar("FairRankTune_instrument_sessions", default=())
+
+    def __init__(self, callback=None, memory=False, keep=True):
+        self.callback = callback
+        self.memory = memory
+        self.keep = keep
+        self.records = []
+        self.started_tracing = False  # whether the session turned tracemalloc on
+        self.token = None
+
+    def __enter__(self):
+        self.token = Instrument._active.set(Instrument._active.get() + (self,))
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        Instrument._active.reset(self.token)
+        self.token = None
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def summary(self):
+        """
+        Totals of the kept records per function.
+        :return: Dictionary (functions are keys) of Dictionaries with keys "calls", "seconds", and "phases".
+        """
+        totals = {}
+        for record in self.records:
+            total = totals.setdefault(
+                record["function"], {"calls": 0, "seconds": 0.0, "phases": {}}
+            )
+            total["calls"] += 1
+            total["seconds"] += record["seconds"]
+            for phase, seconds in record["phases"].items():
+                total["phases"][phase] = total["phases"].get(phase, 0.0) + seconds
+        return totals
+
+
+def __instrumented(fn):
+    """
+    Decorator recording each call of a public metric or ranker function while an Instrument is active.
+    :param fn: Function whose first argument is ranking_df.
+    :return: Wrapped function.
+    """
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        sessions = Instrument._active.get()
+        if not sessions:
+            return fn(*args, **kwargs)
+        stack = __record_stack()
+        rankings, positions = __input_size(args[0] if args else None)
+        memory = (
+            not stack
+            and tracemalloc.is_tracing()
+            and any(session.memory for session in sessions)
+        )
+        record = {
+            "function": fn.__name__,
+            "seconds": None,
+            "rankings": rankings,
+            "positions": positions,
+            "phases": {},
+            "phase_calls": {},
+            "python_blocks": None,
+            "allocated_bytes": None,
+            "peak_bytes": None,
+        }
+        stack.append(record)
+        if memory:
+            tracemalloc.reset_peak()
+            start_bytes = tracemalloc.get_traced_memory()[0]
+        start_blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            record["python_blocks"] = sys.getallocatedblocks() - start_blocks
+            if memory:
+                current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+                record["allocated_bytes"] = current_bytes - start_bytes
+                record["peak_bytes"] = peak_bytes - start_bytes
+            stack.pop()
+            for session in sessions:
+                if session.keep:
+                    session.records.append(record)
+                if session.callback is not None:
+                    session.callback(record)
+
+    return wrapper
+
+
+def __phase(name):
+    """
+    Decorator adding the time of each call of a helper to the named phase of the call in progress.
+    :param name: String, phase name.
+    :return: Decorator.
+    """
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not Instrument._active.get():
+                return fn(*args, **kwargs)
+            stack = __record_stack()
+            if not stack:  # helper called outside of a public function
+                return fn(*args, **kwargs)
+            record = stack[-1]
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                record["phases"][name] = record["phases"].get(name, 0.0) + seconds
+                record["phase_calls"][name] = record["phase_calls"].get(name, 0) + 1
+
+        return wrapper
+
+    return decorator
+
+
+def __record_stack():
+    """
+    Records of the calls in progress in this thread, innermost last.
+    :return: List of records.
+    """
+    stack = getattr(__local, "stack", None)
+    if stack is None:
+        stack = __local.stack = []
+    return stack
+
+
+def __input_size(ranking_df):
+    """
+    Size of the ranking(s) a call was made with.
+    :param ranking_df: Pandas dataframe, Numpy array, RaggedRankings, RankingStore, or anything else.
+    :return: Int number of rankings (or None), Int number of ranked positions not counting padding (or None).
+    """
+    if isinstance(ranking_df, (RaggedRankings, RankingStore)):
+        return len(ranking_df), int(ranking_df.offsets[-1])
+    if isinstance(ranking_df, (pd.DataFrame, np.ndarray)):
+        values = (
+            ranking_df.to_numpy()
+            if isinstance(ranking_df, pd.DataFrame)
+            else ranking_df
+        )
+        # padding is NaN, or -1 in signed integer arrays
+        if values.dtype.kind == "i":
+            positions = np.count_nonzero(values != -1)
+        else:
+            positions = np.count_nonzero(~pd.isnull(values))
+        return (1 if values.ndim == 1 else values.shape[1]), int(positions)
+    return None, None
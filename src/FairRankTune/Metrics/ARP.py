@@ -7,9 +7,13 @@ from FairRankTune.Metrics.ComboUtil import (
     __LTwo,
     __Variance,
 )
-import pandas as pd
-import copy
+from FairRankTune.Metrics.GroupUtil import (
+    __decode_flat,
+    __flat_group_codes,
+    __ranking_ids,
+)
 import numpy as np
+from FairRankTune.Instrumentation import __instrumented, __phase
 
 # Script to calculate ARP metric, using Cachel et al implementation
 # Code References:  https://github.com/KCachel/MANI-Rank/blob/main/multi_fair/metrics.py
@@ -19,51 +23,61 @@ import numpy as np
 
 def __FPR(ranking_df, item_group_dict):
     """Compute the Favored Pair Representation of each group.
-    :param ranking_df: Pandas dataframe of ranking(s).
-    :param item_group_dict: Dictionary of items (keys) and their group membership (values).
+    :param ranking_df: Pandas dataframe or Numpy array of ranking(s).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
     :return fpr: python list of fpr score for each group (indexed by group id)"""
 
-    unique_grps, grp_count_items = np.unique(
-        list(item_group_dict.values()), return_counts=True
-    )
-    num_unique_rankings = len(ranking_df.columns)
-    fpr = np.zeros_like(unique_grps, dtype=np.float64)
+    items, lengths, positions = __decode_flat(ranking_df)
+    codes, unique_grps, grp_count_items = __flat_group_codes(items, item_group_dict)
+    return __fpr_sums(codes, positions, lengths, len(unique_grps)), unique_grps
 
-    for r in range(0, num_unique_rankings):
-        single_ranking = ranking_df[ranking_df.columns[r]]  # isolate ranking
-        single_ranking = np.array(
-            single_ranking[~pd.isnull(single_ranking)]
-        )  # drop any NaNs
-        pair_cnt = __pair_count_at_position_array(len(single_ranking))
-        (
-            groups_of_candidates,
-            groups_of_single_ranking,
-        ) = __create_candidates_by_group_dict(single_ranking, item_group_dict)
-        for i in np.unique(groups_of_single_ranking):
-            cands = groups_of_candidates[i]
-            grp_sz = len(cands)
-            total_favored = int(0)
-            for x in cands:
-                indx_in_r = np.argwhere(single_ranking == x).flatten()[0]
-                favored_pairs_at_pos = pair_cnt[indx_in_r]
-                total_favored += int(favored_pairs_at_pos)
 
-            favored_over_other_grp = total_favored - __pair_count(grp_sz)  # numerator
-            total_mixed_with_group = grp_sz * (
-                len(single_ranking) - grp_sz
-            )  # denominator
-            fpr[np.argwhere(unique_grps == i)[0, 0]] += (
-                favored_over_other_grp / total_mixed_with_group
-            )
+@__phase("group_sums")
+def __fpr_sums(codes, positions, lengths, num_groups, per_ranking=False):
+    """
+    Sum the Favored Pair Representation of each group over the decoded ranking(s).
+    :param codes: Numpy array of group codes of flat decoded ranking(s).
+    :param positions: Numpy array of the position of each item in its ranking.
+    :param lengths: Numpy array of ranking lengths.
+    :param num_groups: Int, number of groups.
+    :param per_ranking: Bool, return the fpr of each group in each ranking instead of the sums.
+    :return: Numpy array of fpr score for each group (indexed by group code), or (rankings x groups) if per_ranking.
+    """
+    num_unique_rankings = len(lengths)
+    # an item is favored over every item ranked below it
+    pair_cnt = np.repeat(lengths, lengths) - 1 - positions
+    # flat (ranking, group) cell of every ranked item
+    cells = __ranking_ids(lengths) * num_groups + codes
+    total_favored = np.bincount(
+        cells, weights=pair_cnt, minlength=num_unique_rankings * num_groups
+    ).reshape(num_unique_rankings, num_groups)
+    grp_sz = np.bincount(cells, minlength=num_unique_rankings * num_groups).reshape(
+        num_unique_rankings, num_groups
+    )
 
-    return fpr, unique_grps
+    favored_over_other_grp = total_favored - __pair_count(grp_sz)  # numerator
+    total_mixed_with_group = grp_sz * (lengths[:, None] - grp_sz)  # denominator
+    in_ranking = grp_sz > 0  # only groups present in a ranking contribute to it
+    if per_ranking:
+        fpr = np.zeros((num_unique_rankings, num_groups))
+        fpr[in_ranking] = (
+            favored_over_other_grp[in_ranking] / total_mixed_with_group[in_ranking]
+        )
+        return fpr
+    fpr = np.bincount(
+        np.nonzero(in_ranking)[1],
+        weights=favored_over_other_grp[in_ranking] / total_mixed_with_group[in_ranking],
+        minlength=num_groups,
+    )
+    return fpr
 
 
+@__instrumented
 def ARP(ranking_df, item_group_dict, combo):
     """
     Calculate Attribute Rank Parity ARP (Cachel et al.).
-    :param ranking_df: Pandas dataframe of ranking(s).
-    :param item_group_dict: Dictionary of items (keys) and their group membership (values).
+    :param ranking_df: Pandas dataframe or Numpy array of ranking(s).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
     :param combo: String for the aggregation metric used in calculating the meta metric.
     :return: ARP value, Dictionary of group FPR scores (groups are keys).
     """
@@ -87,37 +101,7 @@ def ARP(ranking_df, item_group_dict, combo):
 def __pair_count(num_candidates):
     """
     Calculate how many pairs are in a given ranking.
-    :param num_candidates: Int, count of items being ranked.
+    :param num_candidates: Int (or Numpy array of ints), count of items being ranked.
     :return: Int, count of pairs.
     """
     return (num_candidates * (num_candidates - 1)) / 2
-
-
-def __create_candidates_by_group_dict(candidates, item_group_dict):
-    """
-    Function to create dictionary where keys are the group id and values are item id  ints instead of strings.
-    :param candidates: Numpy array of candidates.
-    :param item_group_dict: Dictionary of items (keys) and their group membership (values).
-    :return: group_id_dict, candidate_grp
-    """
-    group_id_dict = {}
-    candidate_grps = [item_group_dict[c] for c in candidates]
-
-    grp_keys = np.unique(candidate_grps)
-    group_id_dict = dict.fromkeys(grp_keys, [])
-
-    for item in item_group_dict:
-        grp = item_group_dict[item]
-        curr = copy.deepcopy(group_id_dict[grp])
-        curr.append(item)
-        group_id_dict.update({grp: curr})
-    return group_id_dict, candidate_grps
-
-
-def __pair_count_at_position_array(num_candidates):
-    """
-    Create a list with the count of pairs associated with each position.
-    :param num_candidates: Int, number of items to be ranked.
-    :return: List of pairs
-    """
-    return list(np.arange(num_candidates - 1, -1, -1))
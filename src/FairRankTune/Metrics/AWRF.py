@@ -1,5 +1,10 @@
-import pandas as pd
 import numpy as np
+from FairRankTune.Metrics.GroupUtil import (
+    __decode_flat,
+    __flat_group_codes,
+    __group_sums,
+)
+from FairRankTune.Metrics.WeightUtil import __position_weights
 from FairRankTune.Metrics.ComboUtil import (
     __MinMaxRatio,
     __MaxMinRatio,
@@ -9,6 +14,7 @@ from FairRankTune.Metrics.ComboUtil import (
     __LTwo,
     __Variance,
 )
+from FairRankTune.Instrumentation import __instrumented
 
 # Script to calculate AWRF metric
 # References: Sapiezynski, P., Zeng, W., E Robertson, R., Mislove, A., & Wilson, C. (2019, May).
@@ -18,35 +24,23 @@ from FairRankTune.Metrics.ComboUtil import (
 # In Proceedings of the 44th International ACM SIGIR Conference on Research and Development in Information Retrieval (pp. 1033-1043).
 
 
+@__instrumented
 def AWRF(ranking_df, item_group_dict, p, combo):
     """
     Calculate group fairness of attention AWRF (Sapiezynski et al.).
-    :param ranking_df: Pandas dataframe of ranking(s).
-    :param item_group_dict: Dictionary of items (keys) and their group membership (values).
+    :param ranking_df: Pandas dataframe or Numpy array of ranking(s).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
     :param p: Float, proportion of attention provided to the first ranked item.
     :param combo: String for the aggregation metric used in calculating the meta metric.
     :return: AWRF value, Dictionary of group average attention scores (groups are keys).
     """
 
-    unique_grps, grp_count_items = np.unique(
-        list(item_group_dict.values()), return_counts=True
-    )
-    num_unique_rankings = len(ranking_df.columns)
-    grp_attention = np.zeros_like(unique_grps, dtype=np.float64)
-
-    for r in range(0, num_unique_rankings):
-        single_ranking = ranking_df[ranking_df.columns[r]]  # isolate ranking
-        single_ranking = np.array(
-            single_ranking[~pd.isnull(single_ranking)]
-        )  # drop any NaNs
-        num_items = len(single_ranking)
-        attn_vals = __attention_vector(num_items, p)
-        for i in range(0, len(single_ranking)):
-            item = single_ranking[i]
-            grp_of_item = item_group_dict[item]
-            attn_of_item = attn_vals[i]
-            # update total group attention
-            grp_attention[np.argwhere(unique_grps == grp_of_item)[0, 0]] += attn_of_item
+    items, lengths, positions = __decode_flat(ranking_df)
+    codes, unique_grps, grp_count_items = __flat_group_codes(items, item_group_dict)
+    num_positions = lengths.max(initial=0)
+    # attention at a position does not depend on ranking length, so one vector serves every ranking
+    attn_vals = __attention_vector(num_positions, p)
+    grp_attention = __group_sums(codes, attn_vals[positions], len(unique_grps))
 
     vals = grp_attention / grp_count_items
 
@@ -73,4 +67,4 @@ def __attention_vector(num_items, p):
     :param p: Float, proportion of attention provided to the first ranked item.
     :return: Numpy array of attention values
     """
-    return np.array([100 * ((1 - p) ** (k - 1)) * p for k in range(1, num_items + 1)])
+    return __position_weights("attention", num_items, p)
@@ -0,0 +1,146 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from FairRankTune.Data.GroupIndex import GroupIndex
+from FairRankTune.RandomUtil import __SeedSequence
+from FairRankTune.Metrics.ComboUtil import __Combine, __CombineRows
+from FairRankTune.Metrics.Evaluate import (
+    __COMPONENTS,
+    __check_inputs,
+    __component_sums,
+    __metric_vals,
+)
+from FairRankTune.Instrumentation import __instrumented, __phase
+
+# Script to calculate bootstrap confidence intervals of group fairness metrics.
+# The per-group contributions of each ranking are computed once, a replicate resamples the rankings with replacement,
+# and the per-group sums of a block of replicates are one product of a (replicates x rankings) count matrix with the
+# (rankings x groups) contributions.
+
+# replicates x rankings cells of the count matrix built at once, each block of replicates draws from its own stream
+__CHUNK_CELLS = 2**22
+
+
+@__instrumented
+def Bootstrap(
+    ranking_df,
+    item_group_dict,
+    metric,
+    combo,
+    num_samples=1000,
+    confidence=0.95,
+    relevance_df=None,
+    ctr_df=None,
+    p=None,
+    decay=None,
+    seed=None,
+    n_jobs=1,
+):
+    """
+    Calculate a group fairness metric with percentile bootstrap confidence intervals, resampling the ranking(s) with replacement.
+    :param ranking_df: Pandas dataframe, Numpy array, or RaggedRankings of ranking(s).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param metric: String, one of "EXP", "EXPU", "EXPRU", "AWRF", "ERBE", "ERBP", "ERBR", and "ARP".
+    :param combo: String for the aggregation metric used in calculating the meta metric.
+    :param num_samples: Int, number of bootstrap replicates.
+    :param confidence: Float in (0, 1), confidence level of the intervals.
+    :param relevance_df: Relevance scores associated with each item in ranking(s), needed by EXPU, EXPRU, and ERBR.
+    :param ctr_df: Click-through-rates associated with each item in ranking(s), needed by EXPRU.
+    :param p: Float, proportion of attention provided to the first ranked item, needed by AWRF.
+    :param decay: Float, decay parameter for exposure based on the rank based precision metric, needed by ERBE, ERBP, and ERBR.
+    :param seed: Random seed value for reproducibility, or a Numpy random Generator (or SeedSequence) owned by the caller.
+    :param n_jobs: Int, number of processes computing replicates (-1 uses all CPUs), the result for a seed does not depend on n_jobs.
+    :return: Tuple of the metric value and its (lower, upper) interval, Dictionary of per-group tuples of the score and its (lower, upper) interval (groups are keys).
+    """
+    __check_inputs([metric], relevance_df, ctr_df, p, decay)
+    if not 0 < confidence < 1:
+        raise AssertionError("Please input a confidence between 0 and 1.")
+    if not num_samples >= 1:
+        raise AssertionError("Please input at least one bootstrap sample.")
+    if n_jobs is None or n_jobs == 0 or n_jobs < -1:
+        raise ValueError("Please input n_jobs greater than or equal to 1, or -1")
+
+    index = GroupIndex(item_group_dict)
+    sums, _, _ = __component_sums(
+        [metric], ranking_df, index, relevance_df, ctr_df, p, decay, per_ranking=True
+    )
+    components = __COMPONENTS[metric]
+    # contributions of every component side by side, one row per ranking
+    contributions = np.concatenate([sums[c] for c in components], axis=1)
+    num_rankings = len(contributions)
+    if num_rankings == 0:
+        raise AssertionError("Please input at least one ranking.")
+
+    vals = __metric_vals(
+        metric, {c: s.sum(axis=0) for c, s in sums.items()}, index.group_counts, decay
+    )
+    value = __Combine(vals, combo)
+
+    block_size = max(1, __CHUNK_CELLS // num_rankings)
+    block_starts = range(0, num_samples, block_size)
+    seeds = __SeedSequence(seed).spawn(len(block_starts))
+    args = [
+        (
+            contributions,
+            components,
+            metric,
+            combo,
+            index.group_counts,
+            decay,
+            min(block_size, num_samples - start),
+            block_seed,
+        )
+        for start, block_seed in zip(block_starts, seeds)
+    ]
+    if n_jobs != 1 and len(args) > 1:
+        with ProcessPoolExecutor(
+            max_workers=os.cpu_count() if n_jobs == -1 else n_jobs
+        ) as pool:
+            blocks = list(pool.map(__replicate_block, *zip(*args)))
+    else:
+        blocks = [__replicate_block(*a) for a in args]
+    replicate_vals = np.concatenate([block[0] for block in blocks])
+    replicate_values = np.concatenate([block[1] for block in blocks])
+
+    # percentile intervals, nan replicates (e.g., a group without relevance) are ignored
+    quantiles = [(1 - confidence) / 2, (1 + confidence) / 2]
+    value_ci = np.nanquantile(replicate_values, quantiles)
+    vals_ci = np.nanquantile(replicate_vals, quantiles, axis=0)
+    return (value, tuple(value_ci)), {
+        grp: (val, tuple(ci)) for grp, val, ci in zip(index.groups, vals, vals_ci.T)
+    }
+
+
+@__phase("resample")
+def __replicate_block(
+    contributions, components, metric, combo, grp_count_items, decay, size, seed
+):
+    """
+    Compute a block of bootstrap replicates of a metric at once.
+    :param contributions: Numpy array (rankings x components * groups) of per-group sums of each ranking.
+    :param components: Tuple of component names, in the order of contributions.
+    :param metric: String, metric name.
+    :param combo: String for the aggregation metric used in calculating the meta metric.
+    :param grp_count_items: Numpy array of group sizes.
+    :param decay: Float or None.
+    :param size: Int, number of replicates.
+    :param seed: Numpy SeedSequence of the block.
+    :return: Numpy array (replicates x groups) of per-group scores, Numpy array of meta metric values.
+    """
+    num_rankings = len(contributions)
+    rng = np.random.default_rng(seed)
+    # resampling index matrix, turned into counts of each ranking in each replicate
+    resample = rng.integers(0, num_rankings, size=(size, num_rankings))
+    cells = (np.arange(size)[:, None] * num_rankings + resample).ravel()
+    counts = np.bincount(cells, minlength=size * num_rankings).reshape(
+        size, num_rankings
+    )
+    replicate_sums = counts @ contributions
+    num_groups = len(grp_count_items)
+    sums = {
+        c: replicate_sums[:, i * num_groups : (i + 1) * num_groups]
+        for i, c in enumerate(components)
+    }
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vals = __metric_vals(metric, sums, grp_count_items, decay)
+        return vals, __CombineRows(vals, combo)
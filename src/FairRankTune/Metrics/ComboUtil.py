@@ -1,7 +1,9 @@
 # Script containing methods to aggregate group-level metrics to meta-metrics.
 import numpy as np
+from FairRankTune.Instrumentation import __phase
 
 
+@__phase("combine")
 def __MinMaxRatio(vals):
     """
     Agg via min max ratio.
@@ -11,6 +13,7 @@ def __MinMaxRatio(vals):
     return np.min(vals) / np.max(vals)
 
 
+@__phase("combine")
 def __MaxMinRatio(vals):
     """
     Agg via max min ratio
@@ -20,6 +23,7 @@ def __MaxMinRatio(vals):
     return np.max(vals) / np.min(vals)
 
 
+@__phase("combine")
 def __MaxMinDiff(vals):
     """
     Agg via max min difference.
@@ -29,6 +33,7 @@ def __MaxMinDiff(vals):
     return np.max(vals) - np.min(vals)
 
 
+@__phase("combine")
 def __MaxAbsDiff(vals):
     """
     Agg via max absolute difference.
@@ -45,6 +50,7 @@ def __MaxAbsDiff(vals):
     return val
 
 
+@__phase("combine")
 def __MeanAbsDev(vals):
     """
     Agg via mean absolute difference,
@@ -55,6 +61,7 @@ def __MeanAbsDev(vals):
     return val
 
 
+@__phase("combine")
 def __LTwo(vals):
     """
     Agg via L2 norm.
@@ -64,6 +71,7 @@ def __LTwo(vals):
     return np.linalg.norm(vals, 2)
 
 
+@__phase("combine")
 def __Variance(vals):
     """
     Agg via variance.
@@ -71,3 +79,50 @@ def __Variance(vals):
     :return: Float score.
     """
     return np.var(vals)
+
+
+def __Combine(vals, combo):
+    """
+    Agg via the aggregation named by combo.
+    :param vals: Numpy array of group level metrics.
+    :param combo: String for the aggregation metric used in calculating the meta metric.
+    :return: Float score.
+    """
+    if combo == "MinMaxRatio":
+        return __MinMaxRatio(vals)
+    if combo == "MaxMinRatio":
+        return __MaxMinRatio(vals)
+    if combo == "MaxMinDiff":
+        return __MaxMinDiff(vals)
+    if combo == "MaxAbsDiff":
+        return __MaxAbsDiff(vals)
+    if combo == "MeanAbsDev":
+        return __MeanAbsDev(vals)
+    if combo == "LTwo":
+        return __LTwo(vals)
+    if combo == "Variance":
+        return __Variance(vals)
+
+
+@__phase("combine")
+def __CombineRows(vals, combo):
+    """
+    Agg every row of group level metrics at once (e.g., one row per bootstrap replicate), via the aggregation named by combo.
+    :param vals: Numpy array of group level metrics (rows x groups).
+    :param combo: String for the aggregation metric used in calculating the meta metric.
+    :return: Numpy array of scores, one per row.
+    """
+    if combo == "MinMaxRatio":
+        return np.min(vals, axis=1) / np.max(vals, axis=1)
+    if combo == "MaxMinRatio":
+        return np.max(vals, axis=1) / np.min(vals, axis=1)
+    if combo == "MaxMinDiff":
+        return np.max(vals, axis=1) - np.min(vals, axis=1)
+    if combo == "MaxAbsDiff":
+        return np.max(np.abs(vals - np.mean(vals, axis=1, keepdims=True)), axis=1)
+    if combo == "MeanAbsDev":
+        return np.mean(np.abs(vals - np.mean(vals, axis=1, keepdims=True)), axis=1)
+    if combo == "LTwo":
+        return np.linalg.norm(vals, 2, axis=1)
+    if combo == "Variance":
+        return np.var(vals, axis=1)
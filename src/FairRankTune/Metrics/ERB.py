@@ -1,5 +1,11 @@
-import pandas as pd
 import numpy as np
+from FairRankTune.Metrics.GroupUtil import (
+    __decode_flat,
+    __flat_group_codes,
+    __decode_values,
+    __group_sums,
+)
+from FairRankTune.Metrics.WeightUtil import __position_weights
 from FairRankTune.Metrics.ComboUtil import (
     __MinMaxRatio,
     __MaxMinRatio,
@@ -9,40 +15,28 @@ from FairRankTune.Metrics.ComboUtil import (
     __LTwo,
     __Variance,
 )
+from FairRankTune.Instrumentation import __instrumented
 
 
 # Script to calculate Exposure Rank Biased Precision metrics
 # References: Kirnap, Ö., Diaz, F., Biega, A.J., Ekstrand, M.D., Carterette, B., & Yilmaz, E. (2021).
 # Estimation of Fair Ranking Metrics with Incomplete Judgments. Proceedings of the Web Conference 2021.
+@__instrumented
 def ERBE(ranking_df, item_group_dict, decay, combo):
     """
     Calculate Exposure Rank Biased Precision Equality ERBE; where exposure should be equal for each group (Kirnap et al.).
-    :param ranking_df: Pandas dataframe of ranking(s).
-    :param item_group_dict: Dictionary of items (keys) and their group membership (values).
+    :param ranking_df: Pandas dataframe or Numpy array of ranking(s).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
     :param decay: Float, decay parameter for exposure based on the rank based precision metric.
     :param combo: String for the aggregation metric used in calculating the meta metric.
     :return: ERBE value, Dictionary of group RBP-based exposures (groups are keys).
     """
 
-    unique_grps, grp_count_items = np.unique(
-        list(item_group_dict.values()), return_counts=True
-    )
-    num_unique_rankings = len(ranking_df.columns)
-    grp_exposures = np.zeros_like(unique_grps, dtype=np.float64)
-
-    for r in range(0, num_unique_rankings):
-        single_ranking = ranking_df[ranking_df.columns[r]]  # isolate ranking
-        single_ranking = np.array(
-            single_ranking[~pd.isnull(single_ranking)]
-        )  # drop any NaNs
-        exp_vals = __exp_rbp_at_position_array(len(single_ranking), decay)
-        for i in range(0, len(single_ranking)):
-            item = single_ranking[i]
-            grp_of_item = item_group_dict[item]
-            exp_of_item = exp_vals[i]
-            # update total group exp
-            grp_id = np.argwhere(unique_grps == grp_of_item)[0, 0]
-            grp_exposures[grp_id] += exp_of_item
+    items, lengths, positions = __decode_flat(ranking_df)
+    codes, unique_grps, grp_count_items = __flat_group_codes(items, item_group_dict)
+    num_positions = lengths.max(initial=0)
+    exp_vals = __exp_rbp_at_position_array(num_positions, decay)
+    grp_exposures = __group_sums(codes, exp_vals[positions], len(unique_grps))
 
     Exposure_g = (1 - decay) * grp_exposures  # Eq. 2 in Kirnap et al.
     vals = Exposure_g
@@ -62,34 +56,21 @@ def ERBE(ranking_df, item_group_dict, decay, combo):
         return __Variance(vals), dict(zip(unique_grps, vals))
 
 
+@__instrumented
 def ERBP(ranking_df, item_group_dict, decay, combo):
     """
     Calculate Exposure Rank Biased Precision Proportionality ERBP; where exposure should be proportional to group size for each group (Kirnap et al.).
-    :param ranking_df: Pandas dataframe of ranking(s).
-    :param item_group_dict: Dictionary of items (keys) and their group membership (values).
+    :param ranking_df: Pandas dataframe or Numpy array of ranking(s).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
     :param decay: Float, decay parameter for exposure based on the rank based precision metric.
     :param combo: String for the aggregation metric used in calculating the meta metric.
     :return: ERBP value, Dictionary of group RBP-based exposures (groups are keys).
     """
-    unique_grps, grp_count_items = np.unique(
-        list(item_group_dict.values()), return_counts=True
-    )
-    num_unique_rankings = len(ranking_df.columns)
-    grp_exposures = np.zeros_like(unique_grps, dtype=np.float64)
-
-    for r in range(0, num_unique_rankings):
-        single_ranking = ranking_df[ranking_df.columns[r]]  # isolate ranking
-        single_ranking = np.array(
-            single_ranking[~pd.isnull(single_ranking)]
-        )  # drop any NaNs
-        exp_vals = __exp_rbp_at_position_array(len(single_ranking), decay)
-        for i in range(0, len(single_ranking)):
-            item = single_ranking[i]
-            grp_of_item = item_group_dict[item]
-            exp_of_item = exp_vals[i]
-            # update total group exp
-
-            grp_exposures[np.argwhere(unique_grps == grp_of_item)[0, 0]] += exp_of_item
+    items, lengths, positions = __decode_flat(ranking_df)
+    codes, unique_grps, grp_count_items = __flat_group_codes(items, item_group_dict)
+    num_positions = lengths.max(initial=0)
+    exp_vals = __exp_rbp_at_position_array(num_positions, decay)
+    grp_exposures = __group_sums(codes, exp_vals[positions], len(unique_grps))
 
     Exposure_g = (1 - decay) * grp_exposures  # Eq. 2 in Kirnap et al.
     vals = Exposure_g / grp_count_items
@@ -110,45 +91,27 @@ def ERBP(ranking_df, item_group_dict, decay, combo):
         return __Variance(vals), dict(zip(unique_grps, vals))
 
 
+@__instrumented
 def ERBR(ranking_df, item_group_dict, relevance_df, decay, combo):
     """
     Calculate Exposure Rank Biased Precision Proportional to Relevance ERBR; where exposure should be proportional to group relevance for each group (Kirnap et al.).
-    :param ranking_df: Pandas dataframe of ranking(s).
-    :param item_group_dict: Dictionary of items (keys) and their group membership (values).
-    :param relevance_df: Pandas dataframe of relevance scores associated with each item in ranking(s).
+    :param ranking_df: Pandas dataframe or Numpy array of ranking(s).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param relevance_df: Pandas dataframe or Numpy array of relevance scores associated with each item in ranking(s).
     :param decay: Float, decay parameter for exposure based on the rank based precision metric.
     :param combo: String for the aggregation metric used in calculating the meta metric.
     :return: ERBR value, Dictionary of group RBP-based exposures (groups are keys).
     """
 
-    unique_grps, grp_count_items = np.unique(
-        list(item_group_dict.values()), return_counts=True
-    )
-    num_unique_rankings = len(ranking_df.columns)
-    grp_exposures = np.zeros_like(unique_grps, dtype=np.float64)
-    grp_relevances = np.zeros_like(unique_grps, dtype=np.float64)
-
-    for r in range(0, num_unique_rankings):
-        single_ranking = ranking_df[ranking_df.columns[r]]  # isolate ranking
-        single_ranking = np.array(
-            single_ranking[~pd.isnull(single_ranking)]
-        )  # drop any NaNs
-        assoc_rel = relevance_df[
-            relevance_df.columns[r]
-        ]  # isolate reelvance score for this ranking
-        assoc_rel = np.array(assoc_rel[~pd.isnull(assoc_rel)])  # drop any NaNs
-        if np.any((assoc_rel != 0) | (assoc_rel != 1)):
-            assert "Exposure Rank Based Precision Proportional to Relevance (ERBR) requires relevance scores to be either 0 (not relevant) or 1 (relevant). "
-        exp_vals = __exp_rbp_at_position_array(len(single_ranking), decay)
-        for i in range(0, len(single_ranking)):
-            item = single_ranking[i]
-            rel_of_item = assoc_rel[i]
-            grp_of_item = item_group_dict[item]
-            exp_of_item = exp_vals[i]
-            # update total group exp
-            grp_id = np.argwhere(unique_grps == grp_of_item)[0, 0]
-            grp_exposures[grp_id] += exp_of_item
-            grp_relevances[grp_id] += rel_of_item
+    items, lengths, positions = __decode_flat(ranking_df)
+    codes, unique_grps, grp_count_items = __flat_group_codes(items, item_group_dict)
+    num_positions = lengths.max(initial=0)
+    relevances, all_relevances = __decode_values(relevance_df, lengths, positions)
+    if np.any((all_relevances != 0) | (all_relevances != 1)):
+        assert "Exposure Rank Based Precision Proportional to Relevance (ERBR) requires relevance scores to be either 0 (not relevant) or 1 (relevant). "
+    exp_vals = __exp_rbp_at_position_array(num_positions, decay)
+    grp_exposures = __group_sums(codes, exp_vals[positions], len(unique_grps))
+    grp_relevances = __group_sums(codes, relevances, len(unique_grps))
 
     Exposure_g = (1 - decay) * grp_exposures  # Eq. 2 in Kirnap et al.
     vals = Exposure_g / grp_relevances
@@ -175,4 +138,4 @@ def __exp_rbp_at_position_array(num_items, decay):
     :param decay: Float, decay parameter for exposure based on the rank based precision metric.
     :return: Numpy array of exposure values.
     """
-    return np.array([decay ** (i - 1) for i in range(1, num_items + 1)])
+    return __position_weights("rbp", num_items, decay)
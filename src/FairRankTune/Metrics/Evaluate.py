@@ -0,0 +1,336 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from FairRankTune.Data.GroupIndex import GroupIndex
+from FairRankTune.Data.RankingStore import RankingStore
+from FairRankTune.Metrics.GroupUtil import (
+    __decode_flat,
+    __flat_group_codes,
+    __decode_values,
+    __group_sums,
+    __ranking_group_sums,
+)
+from FairRankTune.Metrics.ComboUtil import __Combine
+from FairRankTune.Metrics.EXP import __exp_at_position_array
+from FairRankTune.Metrics.AWRF import __attention_vector
+from FairRankTune.Metrics.ERB import __exp_rbp_at_position_array
+from FairRankTune.Metrics.ARP import __fpr_sums
+from FairRankTune.Instrumentation import __instrumented
+
+# Script to calculate several group fairness metrics in one fused pass over the ranking(s).
+# The rankings are decoded and mapped to groups once, and each per-group sum (exposure, attention, RBP exposure,
+# relevance, click-through-rate, favored pairs) is computed once no matter how many metrics use it.
+
+# Per-group sums needed by each metric.
+__COMPONENTS = {
+    "EXP": ("exposure",),
+    "EXPU": ("exposure", "relevance"),
+    "EXPRU": ("ctr", "relevance"),
+    "AWRF": ("attention",),
+    "ERBE": ("rbp",),
+    "ERBP": ("rbp",),
+    "ERBR": ("rbp", "relevance"),
+    "ARP": ("fpr",),
+}
+
+
+@__instrumented
+def Evaluate(
+    ranking_df,
+    item_group_dict,
+    metrics,
+    combos,
+    relevance_df=None,
+    ctr_df=None,
+    p=None,
+    decay=None,
+):
+    """
+    Calculate several group fairness metrics, each with several aggregations, in one pass over the ranking(s).
+    :param ranking_df: Pandas dataframe, Numpy array, or RaggedRankings of ranking(s), or a RankingStore (with its own relevance scores and click-through-rates, so relevance_df and ctr_df must be None).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param metrics: List of metric names, any of "EXP", "EXPU", "EXPRU", "AWRF", "ERBE", "ERBP", "ERBR", and "ARP".
+    :param combos: List of strings for the aggregation metrics used in calculating the meta metrics.
+    :param relevance_df: Pandas dataframe or Numpy array of relevance scores associated with each item in ranking(s), needed by EXPU, EXPRU, and ERBR.
+    :param ctr_df: Pandas dataframe or Numpy array of click-through-rates associated with each item in ranking(s), needed by EXPRU.
+    :param p: Float, proportion of attention provided to the first ranked item, needed by AWRF.
+    :param decay: Float, decay parameter for exposure based on the rank based precision metric, needed by ERBE, ERBP, and ERBR.
+    :return: Dictionary of results (metrics are keys), where each result is a tuple of a Dictionary of meta metric values (combos are keys) and a Dictionary of per-group scores (groups are keys).
+    """
+    if isinstance(ranking_df, RankingStore):
+        if relevance_df is not None or ctr_df is not None:
+            raise ValueError(
+                "Please input the relevance scores and click-through-rates of a RankingStore in the store itself"
+            )
+        # read chunk by chunk in bounded memory, with the relevance scores and click-through-rates of the store
+        return EvaluateShards(
+            ranking_df.chunks(), item_group_dict, metrics, combos, p=p, decay=decay
+        )
+    __check_inputs(metrics, relevance_df, ctr_df, p, decay)
+    sums, unique_grps, grp_count_items = __component_sums(
+        metrics, ranking_df, item_group_dict, relevance_df, ctr_df, p, decay
+    )
+
+    results = {}
+    for metric in metrics:
+        vals = __metric_vals(metric, sums, grp_count_items, decay)
+        results[metric] = (
+            {combo: __Combine(vals, combo) for combo in combos},
+            dict(zip(unique_grps, vals)),
+        )
+    return results
+
+
+@__instrumented
+def EvaluateShards(
+    shards,
+    item_group_dict,
+    metrics,
+    combos,
+    p=None,
+    decay=None,
+    n_jobs=1,
+    executor=None,
+    max_pending=None,
+):
+    """
+    Calculate several group fairness metrics over ranking(s) split into shards, without ever holding all of them at once.
+    Each shard is reduced to partial per-group sums (in a process pool, or on the given executor), and the partial sums
+    are added up into exactly the metrics Evaluate would give on all the ranking(s).
+    :param shards: Iterable of shards. A shard is a ranking_df (Pandas dataframe, Numpy array, or RaggedRankings), a tuple (ranking_df, relevance_df, ctr_df), or a picklable function without arguments returning either (e.g., reading the shard from a file, so each worker loads its own shard).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param metrics: List of metric names, any of "EXP", "EXPU", "EXPRU", "AWRF", "ERBE", "ERBP", "ERBR", and "ARP".
+    :param combos: List of strings for the aggregation metrics used in calculating the meta metrics.
+    :param p: Float, proportion of attention provided to the first ranked item, needed by AWRF.
+    :param decay: Float, decay parameter for exposure based on the rank based precision metric, needed by ERBE, ERBP, and ERBR.
+    :param n_jobs: Int, number of processes reducing shards (-1 uses all CPUs), ignored when an executor is given.
+    :param executor: Optional concurrent.futures.Executor (or any object with a submit method like it) to reduce the shards on.
+    :param max_pending: Int, most shards submitted and not yet added up at once, which bounds the shards held in memory, default is twice the number of processes (or of CPUs, for an executor given).
+    :return: Dictionary of results (metrics are keys), where each result is a tuple of a Dictionary of meta metric values (combos are keys) and a Dictionary of per-group scores (groups are keys).
+    """
+    __check_params(metrics, p, decay)
+    if n_jobs is None or n_jobs == 0 or n_jobs < -1:
+        raise ValueError("Please input n_jobs greater than or equal to 1, or -1")
+    if max_pending is not None and max_pending < 1:
+        raise ValueError("Please input max_pending greater than or equal to 1")
+    index = GroupIndex(item_group_dict)
+    if executor is None and n_jobs != 1:
+        workers = os.cpu_count() if n_jobs == -1 else n_jobs
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return EvaluateShards(
+                shards,
+                index,
+                metrics,
+                combos,
+                p,
+                decay,
+                executor=pool,
+                max_pending=max_pending or 2 * workers,
+            )
+
+    shard_sums = partial(__shard_sums, index=index, metrics=metrics, p=p, decay=decay)
+    # without an executor shards are loaded and reduced one at a time
+    partials = (
+        map(shard_sums, shards)
+        if executor is None
+        else __bounded_map(
+            executor, shard_sums, shards, max_pending or 2 * os.cpu_count()
+        )
+    )
+    # partial sums are added in shard order, so the result does not depend on the executor
+    sums = {
+        c: np.zeros(index.num_groups)
+        for metric in metrics
+        for c in __COMPONENTS[metric]
+    }
+    for partial_sums in partials:
+        for component in sums:
+            sums[component] = sums[component] + partial_sums[component]
+
+    results = {}
+    for metric in metrics:
+        vals = __metric_vals(metric, sums, index.group_counts, decay)
+        results[metric] = (
+            {combo: __Combine(vals, combo) for combo in combos},
+            dict(zip(index.groups, vals)),
+        )
+    return results
+
+
+def __bounded_map(executor, fn, shards, max_pending):
+    """
+    Map a function over the shards on an executor in shard order, submitting a shard only once fewer than max_pending
+    are in flight (unlike Executor.map, which submits every shard up front).
+    :param executor: concurrent.futures.Executor.
+    :param fn: Function of a shard.
+    :param shards: Iterable of shards, read lazily.
+    :param max_pending: Int, most shards submitted and not yet returned.
+    :return: Generator of the results of fn.
+    """
+    pending = deque()
+    try:
+        for shard in shards:
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+            pending.append(executor.submit(fn, shard))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # on an error, don't reduce shards whose sums will never be read
+        for future in pending:
+            future.cancel()
+
+
+def __shard_sums(shard, index, metrics, p, decay):
+    """
+    Reduce one shard of ranking(s) to the per-group sums needed by the metrics.
+    :param shard: Ranking_df, tuple (ranking_df, relevance_df, ctr_df), or function without arguments returning either.
+    :param index: GroupIndex.
+    :param metrics: List of metric names.
+    :param p: Float or None.
+    :param decay: Float or None.
+    :return: Dictionary of per-group sums (components are keys).
+    """
+    if callable(shard):
+        shard = shard()
+    if not isinstance(shard, tuple):
+        shard = (shard,)
+    ranking_df, relevance_df, ctr_df = shard + (None,) * (3 - len(shard))
+    __check_inputs(metrics, relevance_df, ctr_df, p, decay)
+    sums, _, _ = __component_sums(
+        metrics, ranking_df, index, relevance_df, ctr_df, p, decay
+    )
+    return sums
+
+
+def __component_sums(
+    metrics,
+    ranking_df,
+    item_group_dict,
+    relevance_df,
+    ctr_df,
+    p,
+    decay,
+    per_ranking=False,
+):
+    """
+    Compute every per-group sum needed by the metrics, each once.
+    :param metrics: List of metric names.
+    :param ranking_df: Pandas dataframe, Numpy array, or RaggedRankings of ranking(s).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param relevance_df: Relevance scores associated with each item in ranking(s), or None.
+    :param ctr_df: Click-through-rates associated with each item in ranking(s), or None.
+    :param p: Float or None.
+    :param decay: Float or None.
+    :param per_ranking: Bool, keep the sums of each ranking separate (one row per ranking).
+    :return: Dictionary of per-group sums (components are keys), Numpy array of unique groups, Numpy array of group sizes.
+    """
+    items, lengths, positions = __decode_flat(ranking_df)
+    codes, unique_grps, grp_count_items = __flat_group_codes(items, item_group_dict)
+    num_groups = len(unique_grps)
+    num_positions = lengths.max(initial=0)
+    components = set(c for metric in metrics for c in __COMPONENTS[metric])
+    group_sums = __group_sums
+    if per_ranking:
+        group_sums = partial(__ranking_group_sums, lengths=lengths)
+
+    sums = {}
+    if "exposure" in components:
+        exp_vals = __exp_at_position_array(np.sum(grp_count_items))
+        sums["exposure"] = group_sums(codes, exp_vals[positions], num_groups)
+    if "attention" in components:
+        attn_vals = __attention_vector(num_positions, p)
+        sums["attention"] = group_sums(codes, attn_vals[positions], num_groups)
+    if "rbp" in components:
+        exp_vals = __exp_rbp_at_position_array(num_positions, decay)
+        sums["rbp"] = group_sums(codes, exp_vals[positions], num_groups)
+    if "relevance" in components:
+        relevances, all_relevances = __decode_values(relevance_df, lengths, positions)
+        if ({"EXPU", "EXPRU"} & set(metrics)) and np.any(
+            (all_relevances < 0) | (all_relevances > 1)
+        ):
+            raise AssertionError(
+                "Exposure Realized Utility requires that relevance score be between 0 (not relevant) or 1 (relevant)."
+            )
+        sums["relevance"] = group_sums(codes, relevances, num_groups)
+    if "ctr" in components:
+        ctrs, all_ctrs = __decode_values(ctr_df, lengths, positions)
+        if np.any((all_ctrs < 0) | (all_ctrs > 1)):
+            raise AssertionError(
+                "Exposure Realized Utility requires that click through rate be between 0 (no clicks) or 1 (100% ctr). "
+            )
+        sums["ctr"] = group_sums(codes, ctrs, num_groups)
+    if "fpr" in components:
+        sums["fpr"] = __fpr_sums(codes, positions, lengths, num_groups, per_ranking)
+
+    return sums, unique_grps, grp_count_items
+
+
+def __check_inputs(metrics, relevance_df, ctr_df, p, decay):
+    """
+    Function to error check the metrics requested from Evaluate and their parameters.
+    :param metrics: List of metric names.
+    :param relevance_df: Pandas dataframe or Numpy array of relevance scores or None.
+    :param ctr_df: Pandas dataframe or Numpy array of click-through-rates or None.
+    :param p: Float or None.
+    :param decay: Float or None.
+    :return: Raise error if appropriate.
+    """
+    __check_params(metrics, p, decay)
+    for metric in metrics:
+        needs = __COMPONENTS[metric]
+        if "relevance" in needs and relevance_df is None:
+            raise AssertionError(metric + " requires relevance_df.")
+        if "ctr" in needs and ctr_df is None:
+            raise AssertionError(metric + " requires ctr_df.")
+
+
+def __check_params(metrics, p, decay):
+    """
+    Function to error check metric names and their parameters.
+    :param metrics: List of metric names.
+    :param p: Float or None.
+    :param decay: Float or None.
+    :return: Raise error if appropriate.
+    """
+    for metric in metrics:
+        if metric not in __COMPONENTS:
+            raise AssertionError(
+                "Evaluate supports the metrics " + ", ".join(__COMPONENTS) + "."
+            )
+        needs = __COMPONENTS[metric]
+        if "attention" in needs and p is None:
+            raise AssertionError(metric + " requires the attention parameter p.")
+        if "rbp" in needs and decay is None:
+            raise AssertionError(metric + " requires the decay parameter.")
+
+
+def __metric_vals(metric, sums, grp_count_items, decay):
+    """
+    Turn per-group sums into the per-group scores of a metric.
+    :param metric: String, metric name.
+    :param sums: Dictionary of per-group sums (components are keys), sums may have leading dimensions (e.g., one row per ranking).
+    :param grp_count_items: Numpy array of group sizes.
+    :param decay: Float, decay parameter for exposure based on the rank based precision metric.
+    :return: Numpy array of per-group scores.
+    """
+    if metric == "EXP":
+        return sums["exposure"] / grp_count_items
+    if metric == "EXPU":
+        return (sums["exposure"] / grp_count_items) / (
+            sums["relevance"] / grp_count_items
+        )
+    if metric == "EXPRU":
+        return (sums["ctr"] / grp_count_items) / (sums["relevance"] / grp_count_items)
+    if metric == "AWRF":
+        return sums["attention"] / grp_count_items
+    if metric == "ERBE":
+        return (1 - decay) * sums["rbp"]  # Eq. 2 in Kirnap et al.
+    if metric == "ERBP":
+        return (1 - decay) * sums["rbp"] / grp_count_items
+    if metric == "ERBR":
+        return (1 - decay) * sums["rbp"] / sums["relevance"]
+    if metric == "ARP":
+        return sums["fpr"]
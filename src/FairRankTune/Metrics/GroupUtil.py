@@ -0,0 +1,224 @@
+# Script containing methods shared by the group metrics to decode ranking(s) and accumulate per-group sums.
+import numpy as np
+import pandas as pd
+from FairRankTune.Data.GroupIndex import GroupIndex
+from FairRankTune.Data.RaggedRankings import RaggedRankings
+from FairRankTune.Instrumentation import __phase
+
+# pads signed integer Numpy arrays of ranking(s), floating point arrays are padded with NaN
+__PAD = -1
+
+
+@__phase("decode")
+def __decode_rankings(ranking_df):
+    """
+    Decode ranking(s) into a dense array with one ranking per row, dropping any padding.
+    :param ranking_df: Pandas dataframe of ranking(s), Numpy array laid out the same way (positions x rankings, or a 1-D single ranking) padded with NaN (-1 for signed integer arrays), or RaggedRankings.
+    :return: Numpy array of items (rankings x positions) with the items of each ranking moved to the front, Numpy array of ranking lengths.
+    """
+    # lengths of RaggedRankings are known, no need to look for padding
+    if isinstance(ranking_df, RaggedRankings):
+        return ranking_df.to_array().T, ranking_df.lengths
+    values, valid = __valid_entries(ranking_df)
+    lengths = valid.sum(axis=1)
+    if valid.all():
+        return values, lengths
+    # move the valid entries of each ranking to the front, keeping their order
+    items = np.empty_like(values)
+    items[:] = __pad_value(values.dtype)
+    positions = np.cumsum(valid, axis=1) - 1
+    rows = np.broadcast_to(np.arange(values.shape[0])[:, None], values.shape)
+    items[rows[valid], positions[valid]] = values[valid]
+    return items[:, : lengths.max(initial=0)], lengths
+
+
+@__phase("decode")
+def __decode_flat(ranking_df):
+    """
+    Decode ranking(s) into one flat array of their items, ranking after ranking, dropping any padding.
+    RaggedRankings are already stored this way, so their items are used as they are.
+    :param ranking_df: Pandas dataframe of ranking(s), Numpy array laid out the same way (positions x rankings, or a 1-D single ranking) padded with NaN (-1 for signed integer arrays), or RaggedRankings.
+    :return: Numpy array of items, Numpy array of ranking lengths, Numpy array of the position of each item in its ranking (0 is the top).
+    """
+    if isinstance(ranking_df, RaggedRankings):
+        items, lengths = ranking_df.items, ranking_df.lengths
+        positions = np.arange(len(items)) - np.repeat(ranking_df.offsets[:-1], lengths)
+        return items, lengths, positions
+    values, valid = __valid_entries(ranking_df)
+    lengths = valid.sum(axis=1)
+    if valid.all():
+        positions = np.tile(np.arange(values.shape[1]), values.shape[0])
+        return values.ravel(), lengths, positions
+    positions = np.cumsum(valid, axis=1) - 1
+    return values[valid], lengths, positions[valid]
+
+
+def __valid_entries(ranking_df):
+    """
+    Lay out a dense input of ranking(s) with one ranking per row and find its padding.
+    :param ranking_df: Pandas dataframe or Numpy array of ranking(s).
+    :return: Numpy array of values (rankings x positions), Numpy array (rankings x positions) of non-padding entries.
+    """
+    if isinstance(ranking_df, pd.DataFrame):
+        values = ranking_df.to_numpy().T  # one ranking per row
+    else:
+        values = np.asarray(ranking_df)
+        values = values[None, :] if values.ndim == 1 else values.T
+    if values.dtype.kind == "i":
+        return values, values != __PAD
+    return values, ~pd.isnull(values)
+
+
+@__phase("encode")
+def __encode_rankings(items, mask, like):
+    """
+    Encode decoded ranking(s) back into the layout of the input they were decoded from.
+    :param items: Numpy array of items (rankings x positions).
+    :param mask: Numpy array (rankings x positions) of occupied positions.
+    :param like: Pandas dataframe, Numpy array, or RaggedRankings the ranking(s) were decoded from.
+    :return: Pandas dataframe of ranking(s) padded with NaN if like is a dataframe, RaggedRankings if like is, else Numpy array (positions x rankings) padded like __decode_rankings expects.
+    """
+    if isinstance(like, RaggedRankings):
+        offsets = np.concatenate(([0], np.cumsum(mask.sum(axis=1), dtype=np.int64)))
+        return RaggedRankings(items[mask], offsets)
+    if isinstance(like, pd.DataFrame):
+        if not mask.all():
+            items = items.astype(
+                np.float64 if items.dtype.kind in "iu" else items.dtype
+            )
+            items[~mask] = np.nan
+        return pd.DataFrame(items.T, columns=like.columns)
+    if not mask.all():
+        items = items.astype(np.int64 if items.dtype.kind == "u" else items.dtype)
+        items[~mask] = __pad_value(items.dtype)
+    return items.T if np.ndim(like) == 2 else items[0]
+
+
+def __num_rankings(ranking_df):
+    """
+    Count the ranking(s) in ranking_df.
+    :param ranking_df: Pandas dataframe, Numpy array, or RaggedRankings of ranking(s).
+    :return: Int.
+    """
+    if isinstance(ranking_df, RaggedRankings):
+        return len(ranking_df)
+    if isinstance(ranking_df, pd.DataFrame):
+        return len(ranking_df.columns)
+    return 1 if np.ndim(ranking_df) == 1 else np.shape(ranking_df)[1]
+
+
+def __pad_value(dtype):
+    """
+    Padding of ranking(s) stored with dtype.
+    :param dtype: Numpy dtype.
+    :return: -1 for signed integers, NaN for floating point numbers, else None.
+    """
+    if dtype.kind == "i":
+        return __PAD
+    if dtype.kind == "f":
+        return np.nan
+    return None
+
+
+def __position_mask(lengths, num_positions):
+    """
+    Boolean mask of the occupied positions of each ranking.
+    :param lengths: Numpy array of ranking lengths.
+    :param num_positions: Int, number of positions in the decoded rankings.
+    :return: Numpy array (rankings x positions) of booleans.
+    """
+    return np.arange(num_positions)[None, :] < lengths[:, None]
+
+
+def __group_codes(items, mask, item_group_dict):
+    """
+    Map the decoded ranking(s) to integer group codes.
+    :param items: Numpy array of items (rankings x positions).
+    :param mask: Numpy array (rankings x positions) of occupied positions.
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :return: Numpy array of group codes (-1 at unoccupied positions), Numpy array of unique groups, Numpy array of group sizes.
+    """
+    codes = np.full(items.shape, -1, dtype=np.intp)
+    codes[mask], unique_grps, grp_count_items = __flat_group_codes(
+        items[mask], item_group_dict
+    )
+    return codes, unique_grps, grp_count_items
+
+
+@__phase("group_mapping")
+def __flat_group_codes(items, item_group_dict):
+    """
+    Map flat decoded ranking(s) to integer group codes.
+    :param items: Numpy array of items.
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :return: Numpy array of group codes, Numpy array of unique groups, Numpy array of group sizes.
+    """
+    index = GroupIndex(item_group_dict)
+    return index.item_codes(items), index.groups, index.group_counts
+
+
+@__phase("decode")
+def __decode_values(values_df, lengths, positions):
+    """
+    Decode per-position values (e.g., relevance scores) aligned with flat decoded ranking(s).
+    :param values_df: Pandas dataframe, Numpy array, or RaggedRankings of values associated with each item in ranking(s).
+    :param lengths: Numpy array of ranking lengths.
+    :param positions: Numpy array of the position of each item in its ranking.
+    :return: Numpy array of the value of each item (NaN past the end of a ranking's values), Numpy array of all values.
+    """
+    if isinstance(values_df, RaggedRankings):
+        values, value_lengths = values_df.items, values_df.lengths
+    else:
+        values, valid = __valid_entries(values_df)
+        values, value_lengths = values[valid], valid.sum(axis=1)
+    values = values.astype(np.float64)
+    if np.array_equal(value_lengths, lengths):
+        return values, values
+    # values of rankings of another length are looked up by position
+    value_starts = np.cumsum(value_lengths) - value_lengths
+    in_values = positions < np.repeat(value_lengths, lengths)
+    aligned = np.full(len(positions), np.nan)
+    aligned[in_values] = values[
+        np.repeat(value_starts, lengths)[in_values] + positions[in_values]
+    ]
+    return aligned, values
+
+
+def __ranking_ids(lengths):
+    """
+    Ranking of each item of flat decoded ranking(s).
+    :param lengths: Numpy array of ranking lengths.
+    :return: Numpy array of ranking indices.
+    """
+    return np.repeat(np.arange(len(lengths)), lengths)
+
+
+@__phase("group_sums")
+def __group_sums(codes, weights, num_groups):
+    """
+    Sum per-item weights (e.g., position weights or relevance scores) per group with a single scatter-add.
+    :param codes: Numpy array of group codes of flat decoded ranking(s).
+    :param weights: Numpy array of the weight of each item.
+    :param num_groups: Int, number of groups.
+    :return: Numpy array of per-group sums.
+    """
+    # bincount accumulates ranking by ranking, position by position like a nested loop would
+    return np.bincount(codes, weights=weights, minlength=num_groups)
+
+
+@__phase("group_sums")
+def __ranking_group_sums(codes, weights, num_groups, lengths):
+    """
+    Sum per-item weights (e.g., position weights or relevance scores) per group, separately for each ranking.
+    :param codes: Numpy array of group codes of flat decoded ranking(s).
+    :param weights: Numpy array of the weight of each item.
+    :param num_groups: Int, number of groups.
+    :param lengths: Numpy array of ranking lengths.
+    :return: Numpy array (rankings x groups) of per-group sums.
+    """
+    num_rankings = len(lengths)
+    return np.bincount(
+        __ranking_ids(lengths) * num_groups + codes,
+        weights=weights,
+        minlength=num_rankings * num_groups,
+    ).reshape(num_rankings, num_groups)
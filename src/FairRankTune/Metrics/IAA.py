@@ -1,29 +1,34 @@
-import pandas as pd
+import numpy as np
 from FairRankTune.Metrics.ComboUtil import *
+from FairRankTune.Metrics.GroupUtil import __decode_flat
+from FairRankTune.Metrics.WeightUtil import __position_weights
+from FairRankTune.Instrumentation import __instrumented
 
 # Script to calculate Inequity of Amortized Attention Fair Ranking Metric.
 # References: Biega, A.J., Gummadi, K.P., & Weikum, G. (2018). Equity of Attention: Amortizing Individual Fairness in Rankings.
 # The 41st International ACM SIGIR Conference on Research & Development in Information Retrieval.
 
 
+@__instrumented
 def IAA(ranking_df, relevance_df):
     """
     Calculate Inequity of Amortized Attention (Biega et al.).
-    :param ranking_df: Pandas dataframe of ranking(s).
-    :param relevance_df: Pandas dataframe of relevance scores associated with each item in ranking(s).
+    :param ranking_df: Pandas dataframe or Numpy array of ranking(s).
+    :param relevance_df: Pandas dataframe or Numpy array of relevance scores associated with each item in ranking(s).
     :return: IAA value
     """
 
-    num_unique_rankings = len(ranking_df.columns)
-    for r in range(0, num_unique_rankings):
-        single_ranking = ranking_df[ranking_df.columns[r]]  # isolate ranking
-        single_ranking = np.array(
-            single_ranking[~pd.isnull(single_ranking)]
-        )  # drop any NaNs
-        assoc_rel = relevance_df[
-            relevance_df.columns[r]
-        ]  # isolate reelvance score for this ranking
-        assoc_rel = np.array(assoc_rel[~pd.isnull(assoc_rel)])  # drop any NaNs
+    items, lengths, _ = __decode_flat(ranking_df)
+    relevances, rel_lengths, _ = __decode_flat(relevance_df)
+    starts = np.cumsum(lengths) - lengths
+    rel_starts = np.cumsum(rel_lengths) - rel_lengths
+    for r in range(0, len(lengths)):
+        single_ranking = items[
+            starts[r] : starts[r] + lengths[r]
+        ]  # isolate ranking, dropping any NaNs
+        assoc_rel = relevances[
+            rel_starts[r] : rel_starts[r] + rel_lengths[r]
+        ]  # isolate relevance score for this ranking
         if np.any((assoc_rel < 0) | (assoc_rel > 1)):
             assert "IAA requires that relevance score be between 0 and 1."
         attention = __attention_at_position_array(len(single_ranking))
@@ -46,4 +51,4 @@ def __attention_at_position_array(num_items):
     :param num_items: Int, number of items to be ranked.
     :return: Numpy array of attention scores.
     """
-    return np.array([(1 / (np.log2(i + 1))) for i in range(1, num_items + 1)])
+    return __position_weights("log", num_items)
@@ -0,0 +1,94 @@
+import numpy as np
+from FairRankTune.Data.GroupIndex import GroupIndex
+from FairRankTune.Data.RankingStore import RankingStore
+from FairRankTune.Metrics.StreamUtil import (
+    _stream_components,
+    _stream_block_sums,
+    _stream_result,
+)
+
+# Script containing accumulators of group fairness metrics over a stream of ranking(s).
+# Every supported metric is a function of per-group sums over all rankings, so the sums of each new block of rankings
+# are added to running totals and the metric is computed from the totals on demand.
+
+
+class MetricAccumulator:
+    """
+    Running per-group sums of a group fairness metric over a stream of ranking(s), so each update only costs the new rankings.
+    Accumulators of the same metric (e.g., from sharded workers) can be merged.
+    :param metric: String, one of "EXP", "EXPU", "EXPRU", "AWRF", "ERBE", "ERBP", "ERBR", and "ARP".
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param p: Float, proportion of attention provided to the first ranked item, needed by AWRF.
+    :param decay: Float, decay parameter for exposure based on the rank based precision metric, needed by ERBE, ERBP, and ERBR.
+    """
+
+    def __init__(self, metric, item_group_dict, p=None, decay=None):
+        components = _stream_components(metric, p, decay)
+        self.metric = metric
+        self.group_index = GroupIndex(item_group_dict)
+        self.p = p
+        self.decay = decay
+        self.num_rankings = 0
+        self.sums = {
+            component: np.zeros(self.group_index.num_groups) for component in components
+        }
+
+    def update(self, ranking_df, relevance_df=None, ctr_df=None):
+        """
+        Add a block of ranking(s) to the running sums.
+        :param ranking_df: Pandas dataframe, Numpy array, or RaggedRankings of ranking(s), or a RankingStore (read chunk by chunk, with its own relevance scores and click-through-rates, so relevance_df and ctr_df must be None).
+        :param relevance_df: Relevance scores associated with each item in ranking(s), needed by EXPU, EXPRU, and ERBR.
+        :param ctr_df: Click-through-rates associated with each item in ranking(s), needed by EXPRU.
+        :return: The accumulator.
+        """
+        if isinstance(ranking_df, RankingStore):
+            if relevance_df is not None or ctr_df is not None:
+                raise ValueError(
+                    "Please input the relevance scores and click-through-rates of a RankingStore in the store itself"
+                )
+            for chunk in ranking_df.chunks():
+                self.update(*chunk)
+            return self
+        sums, num_rankings = _stream_block_sums(
+            self.metric,
+            self.group_index,
+            self.p,
+            self.decay,
+            ranking_df,
+            relevance_df,
+            ctr_df,
+        )
+        for component in self.sums:
+            self.sums[component] = self.sums[component] + sums[component]
+        self.num_rankings += num_rankings
+        return self
+
+    def merge(self, other):
+        """
+        Add the running sums of another accumulator of the same metric, groups, and parameters.
+        :param other: MetricAccumulator.
+        :return: The accumulator.
+        """
+        if (
+            other.metric != self.metric
+            or other.p != self.p
+            or other.decay != self.decay
+            or not np.array_equal(other.group_index.groups, self.group_index.groups)
+        ):
+            raise AssertionError(
+                "Only accumulators of the same metric, groups, and parameters can be merged."
+            )
+        for component in self.sums:
+            self.sums[component] = self.sums[component] + other.sums[component]
+        self.num_rankings += other.num_rankings
+        return self
+
+    def result(self, combo):
+        """
+        Calculate the metric over all ranking(s) added so far.
+        :param combo: String for the aggregation metric used in calculating the meta metric.
+        :return: Metric value, Dictionary of per-group scores (groups are keys).
+        """
+        return _stream_result(
+            self.metric, self.sums, self.group_index, self.decay, combo
+        )
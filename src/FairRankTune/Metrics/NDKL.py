@@ -1,73 +1,113 @@
 import numpy as np
-import pandas as pd
+from FairRankTune.Metrics.GroupUtil import (
+    __decode_flat,
+    __flat_group_codes,
+    __ranking_ids,
+    __num_rankings,
+)
+from FairRankTune.Metrics.WeightUtil import __position_weights
+from FairRankTune.Instrumentation import __instrumented
 
 # Script to calculate NDKL metric
 # References: Geyik, S. C., Ambler, S., & Kenthapadi, K. (2019, July).
 # Fairness-aware ranking in search & recommendation systems with application to linkedin talent search.
 # In Proceedings of the 25th acm sigkdd international conference on knowledge discovery & data mining (pp. 2221-2231).
 
+# ranked positions x groups cells processed at once by NDKLBatch
+__CHUNK_CELLS = 2**22
+
 
 def __kl_divergence(p, q):
     """
     Calculate KL-Divergence between P and Q, with epsilon to avoid divide by zero.
-    :param p: Numpy array p distribution.
+    :param p: Numpy array p distribution, or one distribution per row.
     :param q: Numpy array q distribution.
-    :return: KL-Divergence score.
+    :return: KL-Divergence score (one per row of p).
     """
     epsilon = 0.0000001  # Epsilon is used here to avoid P or Q is equal to 0. "
     p = p + epsilon
     q = q + epsilon
 
-    return np.sum(p * np.log(p / q))
+    return np.sum(p * np.log(p / q), axis=-1)
 
 
-def NDKL(ranking_df, item_group_dict):
+@__instrumented
+def NDKL(ranking_df, item_group_dict, top_k=None):
     """
     Calculate Normalized Discounted KL-Divergence Score (Geyik et al.).
-    :param ranking_df: Pandas dataframe of ranking(s).
-    :param item_group_dict: Dictionary of items (keys) and their group membership (values).
+    :param ranking_df: Pandas dataframe or Numpy array of ranking(s).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param top_k: Optional Int, only score the prefixes of the first top_k positions (default scores the whole ranking).
     :return: NDKL value.
     """
-    if len(ranking_df.columns) > 1:
-        raise AssertionError("NDKL can only be calculated on a single ranking.")
-
-    single_ranking = ranking_df[ranking_df.columns[0]]  # isolate ranking
-    single_ranking = np.array(
-        single_ranking[~pd.isnull(single_ranking)]
-    )  # drop any NaNs
-
-    group_ids = [item_group_dict[c] for c in single_ranking]
-    unique_grps = np.unique(group_ids)
-    group_ids = np.asarray(
-        [np.argwhere(unique_grps == grp_of_item)[0, 0] for grp_of_item in group_ids]
-    )
-    num_groups = np.max(group_ids)
-    num_items = len(group_ids)
-
-    dr = __distributions(group_ids, num_groups)  # Distributions per group
-    Z = __Z_Vector(num_items)  # Array of Z scores
-
-    # Eq. 4 in Geyik et al.
-    return (1 / np.sum(Z)) * np.sum(
-        [
-            Z[i]
-            * __kl_divergence(__distributions(group_ids[0 : i + 1], num_groups), dr)
-            for i in range(0, num_items)
-        ]
-    )
+    if __num_rankings(ranking_df) > 1:
+        raise AssertionError(
+            "NDKL can only be calculated on a single ranking, use NDKLBatch for multiple rankings."
+        )
+    return NDKLBatch(ranking_df, item_group_dict, top_k)[1][0]
 
 
-def __distributions(ranking, num_groups):
+@__instrumented
+def NDKLBatch(ranking_df, item_group_dict, top_k=None):
     """
-    Calculate the proportion of each group
-    :param ranking: Numpy array of group id represented in the ranking.
-    :param num_groups: Int, number of distinct groups
-    :return: Numpy array of each group's proportion.
+    Calculate Normalized Discounted KL-Divergence Score (Geyik et al.) of every ranking at once.
+    :param ranking_df: Pandas dataframe or Numpy array of ranking(s), rankings of different lengths are padded with NaNs.
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param top_k: Optional Int, only score the prefixes of the first top_k positions (default scores the whole ranking).
+    :return: Mean NDKL value over the rankings, Numpy array of NDKL values (one per ranking).
     """
-    return np.array(
-        [((ranking == i).sum()) / len(ranking) for i in range(0, num_groups + 1)]
+    if top_k is not None and top_k < 1:
+        raise AssertionError("NDKL requires top_k to be a positive integer.")
+
+    items, lengths, positions = __decode_flat(ranking_df)
+    codes, unique_grps, grp_count_items = __flat_group_codes(items, item_group_dict)
+    num_groups = len(unique_grps)
+    max_length = lengths.max(initial=0)
+    num_positions = max_length if top_k is None else min(top_k, max_length)
+    Z = __Z_Vector(num_positions)  # Array of Z scores
+    ranking_ids = __ranking_ids(lengths)
+
+    # Distributions per group for each whole ranking
+    dr = (
+        np.bincount(
+            ranking_ids * num_groups + codes, minlength=len(lengths) * num_groups
+        ).reshape(len(lengths), num_groups)
+        / lengths[:, None]
     )
 
+    # only the prefixes of the first num_positions positions are scored
+    scored = positions < num_positions
+    codes = codes[scored]
+    positions = positions[scored]
+    ranking_ids = ranking_ids[scored]
+    scored_offsets = np.concatenate(
+        ([0], np.cumsum(np.minimum(lengths, num_positions)))
+    )
+
+    ndkl = np.empty(len(lengths), dtype=np.float64)
+    # bound the ranked positions x groups working arrays
+    chunk = max(1, __CHUNK_CELLS // max(1, num_positions * num_groups))
+    for start in range(0, len(lengths), chunk):
+        stop = min(start + chunk, len(lengths))
+        cells = slice(scored_offsets[start], scored_offsets[stop])
+        one_hot = codes[cells, None] == np.arange(num_groups)
+        # Distributions per prefix from cumulative group counts, restarted at every ranking
+        counts = np.cumsum(one_hot, axis=0)
+        counts_before = np.vstack((np.zeros((1, num_groups), counts.dtype), counts))
+        starts = scored_offsets[start:stop] - scored_offsets[start]
+        scored_lengths = np.diff(scored_offsets[start : stop + 1])
+        counts -= np.repeat(counts_before[starts], scored_lengths, axis=0)
+        prefix_dr = counts / (positions[cells, None] + 1)
+        rows = ranking_ids[cells] - start
+        Z_r = Z[positions[cells]]
+        kl = __kl_divergence(prefix_dr, dr[ranking_ids[cells]])
+        # Eq. 4 in Geyik et al.
+        ndkl[start:stop] = (
+            1 / np.bincount(rows, weights=Z_r, minlength=stop - start)
+        ) * np.bincount(rows, weights=Z_r * kl, minlength=stop - start)
+
+    return np.mean(ndkl), ndkl
+
 
 def __Z_Vector(k):
     """
@@ -75,4 +115,4 @@ def __Z_Vector(k):
     :param k: Int, position of ranking.
     :return: Numpy array of Z values.
     """
-    return 1 / np.log2(np.array(range(0, k)) + 2)
+    return __position_weights("log", k)
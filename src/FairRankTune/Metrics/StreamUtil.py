@@ -0,0 +1,60 @@
+# Script containing methods shared by the metrics kept over streams of ranking(s) (MetricAccumulator and WindowedMetric).
+# These are called from inside class bodies, where dunder names would be mangled, so they take a single underscore.
+from FairRankTune.Metrics.GroupUtil import __num_rankings
+from FairRankTune.Metrics.ComboUtil import __Combine
+from FairRankTune.Metrics.Evaluate import (
+    __COMPONENTS,
+    __check_inputs,
+    __check_params,
+    __component_sums,
+    __metric_vals,
+)
+
+
+def _stream_components(metric, p, decay):
+    """
+    Error check the metric and parameters of a stream, and find the per-group sums it keeps.
+    Relevance scores and click-through-rates are checked with each block.
+    :param metric: String, metric name.
+    :param p: Float or None.
+    :param decay: Float or None.
+    :return: Tuple of component names, or raise error if appropriate.
+    """
+    __check_params([metric], p, decay)
+    return __COMPONENTS[metric]
+
+
+def _stream_block_sums(
+    metric, group_index, p, decay, ranking_df, relevance_df, ctr_df, per_ranking=False
+):
+    """
+    Per-group sums of a block of ranking(s) of a stream.
+    :param metric: String, metric name.
+    :param group_index: GroupIndex.
+    :param p: Float or None.
+    :param decay: Float or None.
+    :param ranking_df: Pandas dataframe, Numpy array, or RaggedRankings of ranking(s).
+    :param relevance_df: Relevance scores associated with each item in ranking(s), or None.
+    :param ctr_df: Click-through-rates associated with each item in ranking(s), or None.
+    :param per_ranking: Bool, keep the sums of each ranking separate (one row per ranking).
+    :return: Dictionary of per-group sums (components are keys), Int number of ranking(s) in the block.
+    """
+    __check_inputs([metric], relevance_df, ctr_df, p, decay)
+    sums, _, _ = __component_sums(
+        [metric], ranking_df, group_index, relevance_df, ctr_df, p, decay, per_ranking
+    )
+    return sums, __num_rankings(ranking_df)
+
+
+def _stream_result(metric, sums, group_index, decay, combo):
+    """
+    Calculate a metric from the per-group sums of a stream.
+    :param metric: String, metric name.
+    :param sums: Dictionary of per-group sums (components are keys).
+    :param group_index: GroupIndex.
+    :param decay: Float or None.
+    :param combo: String for the aggregation metric used in calculating the meta metric.
+    :return: Metric value, Dictionary of per-group scores (groups are keys).
+    """
+    vals = __metric_vals(metric, sums, group_index.group_counts, decay)
+    return __Combine(vals, combo), dict(zip(group_index.groups, vals))
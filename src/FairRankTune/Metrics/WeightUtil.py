@@ -0,0 +1,60 @@
+# Script containing the shared cache of position weight curves (exposure, attention, rank biased precision) used by the metrics.
+import threading
+from collections import OrderedDict
+import numpy as np
+from FairRankTune.Instrumentation import __phase
+
+__MAX_CURVES = 64  # curves kept before the least recently used one is evicted
+__curves = OrderedDict()  # (curve type, parameter) -> longest curve computed so far
+__lock = threading.Lock()
+
+
+@__phase("weights")
+def __position_weights(curve, num_positions, param=None):
+    """
+    Weight of each of the first num_positions positions, served from a cache keyed by (curve type, parameter).
+    Only the longest curve of each key is kept, shorter requests are served as a prefix of it.
+    :param curve: String, one of "log" (1 / log2(position + 1)), "attention" (100 * (1 - param) ** (position - 1) * param), or "rbp" (param ** (position - 1)).
+    :param num_positions: Int, number of positions.
+    :param param: Float, parameter of the curve (None for "log").
+    :return: Read-only Numpy array of weights.
+    """
+    key = (curve, param)
+    with __lock:
+        weights = __curves.get(key)
+        if weights is not None and len(weights) >= num_positions:
+            __curves.move_to_end(key)
+            return weights[:num_positions]
+    weights = __compute_weights(curve, num_positions, param)
+    weights.flags.writeable = False  # shared between callers
+    with __lock:
+        cached = __curves.get(key)
+        if cached is None or len(cached) < num_positions:
+            __curves[key] = weights
+        __curves.move_to_end(key)
+        while len(__curves) > __MAX_CURVES:
+            __curves.popitem(last=False)
+    return weights
+
+
+def __compute_weights(curve, num_positions, param):
+    """
+    Compute a position weight curve.
+    :param curve: String, one of "log", "attention", or "rbp".
+    :param num_positions: Int, number of positions.
+    :param param: Float, parameter of the curve.
+    :return: Numpy array of weights.
+    """
+    if curve == "log":
+        return 1 / np.log2(np.arange(2, num_positions + 2, dtype=np.float64))
+    # powers use Python's float pow, so the curves match the scalar formulas exactly
+    if curve == "attention":
+        powers = np.fromiter(
+            ((1 - param) ** k for k in range(num_positions)), np.float64, num_positions
+        )
+        return 100 * powers * param
+    if curve == "rbp":
+        return np.fromiter(
+            (param**k for k in range(num_positions)), np.float64, num_positions
+        )
+    raise ValueError("Unknown position weight curve " + str(curve))
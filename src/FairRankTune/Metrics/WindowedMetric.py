@@ -0,0 +1,196 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+from FairRankTune.Data.GroupIndex import GroupIndex
+from FairRankTune.Metrics.StreamUtil import (
+    _stream_components,
+    _stream_block_sums,
+    _stream_result,
+)
+
+# Script containing group fairness metrics over a moving window of a stream of ranking(s).
+# Each ranking contributes a vector of per-group sums, the window keeps the contributions of the rankings inside it
+# and running totals, so adding or evicting a ranking costs O(groups) however long the stream is.
+
+
+class WindowedMetric:
+    """
+    Group fairness metric over the most recent ranking(s) of a stream. Exactly one kind of window is chosen:
+    the last window rankings (by count), the rankings within duration of the latest timestamp (by time), or
+    every ranking weighted by 0.5 ** (age / half_life) (exponential time decay).
+    Timestamps are numbers or Numpy/Pandas datetimes (with duration and half_life given as timedeltas).
+    :param metric: String, one of "EXP", "EXPU", "EXPRU", "AWRF", "ERBE", "ERBP", "ERBR", and "ARP".
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param window: Int, number of most recent rankings in the window.
+    :param duration: Length of time covered by the window, rankings with timestamp <= latest timestamp - duration are evicted.
+    :param half_life: Age at which a ranking's contribution is halved.
+    :param p: Float, proportion of attention provided to the first ranked item, needed by AWRF.
+    :param decay: Float, decay parameter for exposure based on the rank based precision metric, needed by ERBE, ERBP, and ERBR.
+    """
+
+    def __init__(
+        self,
+        metric,
+        item_group_dict,
+        window=None,
+        duration=None,
+        half_life=None,
+        p=None,
+        decay=None,
+    ):
+        self.__check_window(window, duration, half_life)
+        self.components = _stream_components(metric, p, decay)
+        self.metric = metric
+        self.group_index = GroupIndex(item_group_dict)
+        self.p = p
+        self.decay = decay
+        self.window = window
+        self.duration = duration
+        self.half_life = half_life
+        # per-group sums of every component side by side, component i is totals[i * groups:(i + 1) * groups]
+        self.totals = np.zeros(len(self.components) * self.group_index.num_groups)
+        self.events = deque()  # (timestamp, contribution) of each ranking in the window
+        self.latest = None  # latest timestamp seen
+        self.seen = 0  # rankings added so far
+        self.evictions = 0  # evictions since the totals were last re-summed
+
+    @property
+    def num_rankings(self):
+        """
+        Number of ranking(s) in the window (ranking(s) seen so far with exponential time decay).
+        :return: Int.
+        """
+        return len(self.events) if self.half_life is None else self.seen
+
+    @property
+    def sums(self):
+        """
+        Per-group sums over the window.
+        :return: Dictionary of per-group sums (components are keys).
+        """
+        num_groups = self.group_index.num_groups
+        return {
+            component: self.totals[i * num_groups : (i + 1) * num_groups]
+            for i, component in enumerate(self.components)
+        }
+
+    def update(self, ranking_df, relevance_df=None, ctr_df=None, timestamps=None):
+        """
+        Add a block of ranking(s) to the window in order (column by column), evicting ranking(s) that fall out of it.
+        :param ranking_df: Pandas dataframe, Numpy array, or RaggedRankings of ranking(s).
+        :param relevance_df: Relevance scores associated with each item in ranking(s), needed by EXPU, EXPRU, and ERBR.
+        :param ctr_df: Click-through-rates associated with each item in ranking(s), needed by EXPRU.
+        :param timestamps: Array-like (e.g., a Pandas series) of non-decreasing timestamps, one per ranking, needed with duration or half_life.
+        :return: The windowed metric.
+        """
+        sums, _ = _stream_block_sums(
+            self.metric,
+            self.group_index,
+            self.p,
+            self.decay,
+            ranking_df,
+            relevance_df,
+            ctr_df,
+            per_ranking=True,
+        )
+        contributions = np.concatenate([sums[c] for c in self.components], axis=1)
+        if timestamps is None:
+            if self.window is None:
+                raise AssertionError(
+                    "Timestamps are needed for a window by duration or half life."
+                )
+            timestamps = [None] * len(contributions)
+        else:
+            timestamps = self.__timestamps(timestamps)
+            if timestamps.shape != (len(contributions),):
+                raise AssertionError("Please input one timestamp per ranking.")
+        for timestamp, contribution in zip(timestamps, contributions):
+            self.__add(timestamp, contribution)
+        return self
+
+    def advance(self, timestamp):
+        """
+        Move the window to a later time without adding rankings (e.g., before reading the result of a quiet stream).
+        :param timestamp: Timestamp, not earlier than the latest one seen.
+        :return: The windowed metric.
+        """
+        if self.window is not None:
+            raise AssertionError("Only windows by duration or half life can advance.")
+        self.__add(self.__timestamps([timestamp])[0], None)
+        return self
+
+    def result(self, combo):
+        """
+        Calculate the metric over the ranking(s) in the window.
+        :param combo: String for the aggregation metric used in calculating the meta metric.
+        :return: Metric value, Dictionary of per-group scores (groups are keys).
+        """
+        return _stream_result(
+            self.metric, self.sums, self.group_index, self.decay, combo
+        )
+
+    @staticmethod
+    def __check_window(window, duration, half_life):
+        """
+        Error check the window of a windowed metric.
+        :param window: Int or None.
+        :param duration: Length of time or None.
+        :param half_life: Length of time or None.
+        :return: Raise error if appropriate.
+        """
+        if sum(arg is not None for arg in (window, duration, half_life)) != 1:
+            raise AssertionError(
+                "Please input exactly one of window, duration, half_life."
+            )
+        if window is not None and not window >= 1:
+            raise AssertionError("Please input a window of at least one ranking.")
+
+    @staticmethod
+    def __timestamps(timestamps):
+        """
+        Convert timestamps to a Numpy array, datetimes become datetime64 so they can be compared and subtracted.
+        :param timestamps: Array-like of numbers or datetimes.
+        :return: Numpy array.
+        """
+        return pd.Series(timestamps).to_numpy()
+
+    def __add(self, timestamp, contribution):
+        """
+        Add one ranking's contribution (or only move the clock, if contribution is None) and evict what falls out of the window.
+        :param timestamp: Timestamp of the ranking, or None for a window by count.
+        :param contribution: Numpy array of the ranking's per-group sums, side by side for each component, or None.
+        :return: None.
+        """
+        if timestamp is not None:
+            if self.latest is not None and timestamp < self.latest:
+                raise AssertionError("Please input non-decreasing timestamps.")
+            if self.half_life is not None:
+                if self.latest is not None:
+                    age = (timestamp - self.latest) / self.half_life
+                    self.totals *= 0.5 ** float(age)
+                if contribution is not None:
+                    self.totals += contribution
+                    self.seen += 1
+                self.latest = timestamp
+                return
+            self.latest = timestamp
+        if contribution is not None:
+            self.events.append((timestamp, contribution))
+            self.totals += contribution
+            self.seen += 1
+        events = self.events
+        if self.window is not None:
+            while len(events) > self.window:
+                self.totals -= events.popleft()[1]
+                self.evictions += 1
+        else:
+            cutoff = self.latest - self.duration
+            while events and events[0][0] <= cutoff:
+                self.totals -= events.popleft()[1]
+                self.evictions += 1
+        # re-sum once per window turnover, so rounding errors of the subtractions don't build up
+        if self.evictions > max(len(events), 1):
+            self.totals = sum(
+                (contribution for _, contribution in events), np.zeros_like(self.totals)
+            )
+            self.evictions = 0
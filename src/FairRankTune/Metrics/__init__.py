@@ -5,3 +5,7 @@ from FairRankTune.Metrics.EXP import *
 from FairRankTune.Metrics.ERB import *
 from FairRankTune.Metrics.IAA import *
 from FairRankTune.Metrics.ComboUtil import *
+from FairRankTune.Metrics.Evaluate import *
+from FairRankTune.Metrics.MetricAccumulator import *
+from FairRankTune.Metrics.WindowedMetric import *
+from FairRankTune.Metrics.Bootstrap import *
@@ -0,0 +1,19 @@
+import numpy as np
+
+# Script containing methods shared by the functions drawing random numbers (RankTune and Bootstrap).
+
+
+def __SeedSequence(seed):
+    """
+    Function to turn the seed of a call into a SeedSequence local to that call, the global random state is never used.
+    :param seed: None, Int, Numpy SeedSequence (left untouched), or Numpy random Generator (which is advanced by drawing the entropy).
+    :return: Numpy SeedSequence.
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        # a copy, as spawning advances the caller's SeedSequence and the same seed must give the same streams
+        return np.random.SeedSequence(
+            seed.entropy, spawn_key=seed.spawn_key, pool_size=seed.pool_size
+        )
+    if isinstance(seed, np.random.Generator):
+        return np.random.SeedSequence(seed.integers(0, 2**63, size=4).tolist())
+    return np.random.SeedSequence(seed)
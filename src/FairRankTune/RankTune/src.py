@@ -1,6 +1,13 @@
-import random
+import os
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
+from FairRankTune.Data.GroupIndex import GroupIndex
+from FairRankTune.Data.RaggedRankings import RaggedRankings
+from FairRankTune.RandomUtil import __SeedSequence
+
+# rankings per independently seeded block generated by the Gen* functions
+__BLOCK_RANKINGS = 100
 
 
 def __CheckFull(phi):
@@ -16,6 +23,16 @@ def __CheckFull(phi):
         raise ValueError("Please input phi greater than or equal to 0")
 
 
+def __CheckScoreDist(score_dist):
+    """
+    Function to error check score_dist parameter.
+    :param score_dist: String, either "uniform" or "normal".
+    :return: Raise error if appropriate.
+    """
+    if score_dist not in ("normal", "uniform"):
+        raise ValueError("Please input score_dist of either normal or uniform")
+
+
 def __CheckDistributions(group_proportions, num_items, phi):
     """
     Function to error check distribution input.
@@ -37,17 +54,57 @@ def __CheckDistributions(group_proportions, num_items, phi):
         raise TypeError("Input num_items must be int")
 
 
-def __MakeRank(item_ids, group_ids, phi):
+def __CastItems(item_ids, item_dtype):
+    """
+    Function to cast item ids to item_dtype, checking that every id fits the dtype.
+    :param item_ids: Numpy array of item ids.
+    :param item_dtype: Numpy dtype to store item ids with, None keeps the dtype of item_ids.
+    :return: Numpy array of item ids, or raise error if appropriate.
+    """
+    item_ids = np.asarray(item_ids)
+    if item_dtype is None:
+        return item_ids
+    dtype = np.dtype(item_dtype)
+    if dtype.kind in "iu" and item_ids.dtype.kind in "iu":
+        info = np.iinfo(dtype)
+        if len(item_ids) and (item_ids.min() < info.min or item_ids.max() > info.max):
+            raise ValueError(
+                "Please input an item_dtype that can hold every item id, ids range from %d to %d"
+                % (item_ids.min(), item_ids.max())
+            )
+    elif not np.can_cast(item_ids.dtype, dtype, casting="same_kind"):
+        raise ValueError("Please input an item_dtype that can hold every item id")
+    return item_ids.astype(dtype, copy=False)
+
+
+def __Output(values, ragged, dtype=None):
+    """
+    Function to wrap generated rankings (or scores) for output.
+    :param values: Numpy array (items x rankings).
+    :param ragged: Bool, whether to return RaggedRankings.
+    :param dtype: Numpy dtype of the RaggedRankings values, None stores item ids compactly (int32 when they fit).
+    :return: RaggedRankings if ragged else Pandas dataframe.
+    """
+    if ragged:
+        num_items, r_cnt = values.shape
+        return RaggedRankings.from_array(values, np.full(r_cnt, num_items), dtype)
+    return pd.DataFrame(values)
+
+
+def __MakeRank(item_ids, group_ids, phi, rng):
     """
     Function for core RankTune fairness-aware ranked list generation.
     :param item_ids: Numpy array of item ids.
     :param group_ids: Numpy array of corresponding group ids.
     :param phi: Float, Representativeness in range [0,1]; where 0 is unfair and 1 is most fair and representative.
+    :param rng: Numpy random Generator.
     :return: Numpy array of items (i.e., generated ranking).
     """
-    resulting_ranking = []
-
-    unique_grp_ids, grp_count = np.unique(group_ids, return_counts=True)
+    unique_grp_ids, grp_codes, grp_count = np.unique(
+        group_ids, return_inverse=True, return_counts=True
+    )
+    # items without a group (when proportions don't divide num_items) count towards the pool but are not ranked
+    num_ranked = len(group_ids)
     grp_proportion = grp_count / len(item_ids)  # proportion of total pool
 
     minority_index = np.argmin(grp_proportion)
@@ -58,62 +115,108 @@ def __MakeRank(item_ids, group_ids, phi):
     ) * (1 - phi_scaled)
 
     grp_proportion[minority_index] = phi_scaled
-    items_in_each_group_id = [
-        item_ids[np.where(np.asarray(group_ids) == i)[0].tolist()].tolist()
-        for i in unique_grp_ids
-    ]  # indexed by group_id #
 
+    # items laid out group after group, group g occupies grp_start[g]:grp_start[g] + grp_count[g]
     if phi == 0:  # shuffle items in positions to add randomness
-        for i in range(len(items_in_each_group_id)):
-            random.shuffle(items_in_each_group_id[i])
-
-    lows = np.zeros_like(unique_grp_ids, dtype=float)
-    highs = np.zeros_like(unique_grp_ids, dtype=float)
+        order = np.lexsort((rng.random(num_ranked), grp_codes))
+    else:
+        order = np.argsort(grp_codes, kind="stable")
+    items_by_grp = item_ids[order]
+    grp_start = np.cumsum(grp_count) - grp_count
+
+    # set the upper bounds of group proportions, the lower bound of a group is the upper bound of the previous one
+    highs = np.cumsum(grp_proportion)
     highs[-1] = 1  # last has to be 1
 
-    # set the bounds of group proportions
-    low_counter = 0
-    for g in range(0, len(unique_grp_ids)):
-        lows[g] = low_counter
-        upper_bound = low_counter + grp_proportion[g]
-        highs[g] = upper_bound
-        low_counter = upper_bound
-
-    while all(grp_count > 0):  # each group has items to place
-        r = random.uniform(0, 1)
-        grp_2_place = np.argwhere(
-            np.bitwise_and(r > lows, r < highs) == True
-        ).flatten()[0]
-        resulting_ranking.append(items_in_each_group_id[grp_2_place].pop())
-        grp_count[grp_2_place] -= 1
-
-    # place items in order of smallest to largest group
-    while all(grp_count == 0) == False:
-        grp_2_add = np.argwhere(
-            grp_count == np.min(grp_count[np.nonzero(grp_count)])
-        ).flatten()[0]
-        for i in range(0, grp_count[grp_2_add]):
-            resulting_ranking.append(items_in_each_group_id[grp_2_add].pop())
-            grp_count[grp_2_add] -= 1
-
-    return np.asarray(resulting_ranking)
+    # draw a group for every position, only the draws until the first group runs out of items are used
+    grp_2_place = np.searchsorted(highs, rng.random(num_ranked), side="right")
+    by_grp = np.argsort(grp_2_place, kind="stable")
+    # how many earlier draws picked the same group
+    nth_of_grp = np.empty_like(grp_2_place)
+    nth_of_grp[by_grp] = np.arange(num_ranked) - np.searchsorted(
+        grp_2_place[by_grp], grp_2_place[by_grp]
+    )
+    num_placed = np.argmax(nth_of_grp == grp_count[grp_2_place] - 1) + 1
+    grp_2_place = grp_2_place[:num_placed]
+    # each group places its items starting from the back of its list
+    placed = items_by_grp[
+        grp_start[grp_2_place] + grp_count[grp_2_place] - 1 - nth_of_grp[:num_placed]
+    ]
+
+    # place the remaining items in order of smallest to largest group
+    grp_remaining = grp_count - np.bincount(grp_2_place, minlength=len(grp_count))
+    resulting_ranking = [placed]
+    for g in np.lexsort((np.arange(len(grp_count)), grp_remaining)):
+        if grp_remaining[g] > 0:
+            resulting_ranking.append(
+                items_by_grp[grp_start[g] : grp_start[g] + grp_remaining[g]][::-1]
+            )
+
+    return np.concatenate(resulting_ranking)
+
+
+def __MakeRanks(item_ids, group_ids, phi, r_cnt, rng, item_dtype):
+    """
+    Function to generate several RankTune rankings into a preallocated array.
+    :param item_ids: Numpy array of item ids.
+    :param group_ids: Numpy array of corresponding group ids.
+    :param phi: Float, Representativeness in range [0,1]; where 0 is unfair and 1 is most fair and representative.
+    :param r_cnt: Int, number of rankings to generate.
+    :param rng: Numpy random Generator.
+    :param item_dtype: Numpy dtype to store item ids with, None keeps the dtype of item_ids.
+    :return: Numpy array of items (items x rankings).
+    """
+    item_ids = __CastItems(item_ids, item_dtype)
+    items = np.empty((len(group_ids), r_cnt), dtype=item_ids.dtype)
+    for i in range(0, r_cnt):
+        items[:, i] = __MakeRank(item_ids, group_ids, phi, rng)
+    return items
 
 
-def GenFromGroups(group_proportions, num_items, phi, r_cnt, seed):
+def __MakeScores(num_items, r_cnt, score_dist, rng, score_dtype):
+    """
+    Function to generate descending relevance scores for several rankings into a preallocated array.
+    :param num_items: Int, number of items in ranking(s).
+    :param r_cnt: Int, number of rankings to generate scores for.
+    :param score_dist: String, either "uniform" or "normal for generating scores.
+    :param rng: Numpy random Generator.
+    :param score_dtype: Numpy dtype to store scores with, None stores float64.
+    :return: Numpy array of scores (items x rankings).
+    """
+    scores = np.empty((num_items, r_cnt), dtype=score_dtype or np.float64)
+    for i in range(0, r_cnt):
+        if score_dist == "normal":
+            scores[:, i] = -np.sort(-rng.standard_normal(size=num_items))
+        else:
+            scores[:, i] = -np.sort(-rng.uniform(0, 1, size=num_items))
+    return scores
+
+
+def GenFromGroups(
+    group_proportions,
+    num_items,
+    phi,
+    r_cnt,
+    seed,
+    item_dtype=None,
+    n_jobs=1,
+    ragged=False,
+):
     """
     RankTune method generating data from group proportions (as opposed to actual items).
     :param group_proportions: Numpy array of group_proportions.
     :param num_items: Int, number of items in ranking(s).
     :param phi: Float, Representativeness in range [0,1]; where 0 is unfair and 1 is most fair and representative.
     :param r_cnt: Int, number of rankings to generate.
-    :param seed: Random seed value for reproducibility.
+    :param seed: Random seed value for reproducibility, or a Numpy random Generator (or SeedSequence) owned by the caller.
+    :param item_dtype: Optional Numpy dtype for the generated item ids (e.g., np.int32 or np.uint16), default keeps the dtype of the items.
+    :param n_jobs: Int, number of processes generating rankings (-1 uses all CPUs), the output for a seed does not depend on n_jobs.
+    :param ragged: Bool, return the ranking(s) (and scores) as RaggedRankings instead of Pandas dataframes.
     :return: ranking_df - Pandas dataframe of generated ranking(s),  item_group_dict -  Dictionary of items (keys) and their group membership (values).
     """
     __CheckDistributions(group_proportions, num_items, phi)
     item_ids = np.arange(0, num_items)
     group_ids = np.empty(0, dtype=int)
-    np.random.seed(seed)  # For reproducibility
-    random.seed(seed)
     for g in range(0, len(group_proportions)):
         group_ids = np.hstack(
             (group_ids, np.tile(int(g), int(num_items * group_proportions[g])))
@@ -122,16 +225,26 @@ def GenFromGroups(group_proportions, num_items, phi, r_cnt, seed):
     # Make item_group_dict
     item_group_dict = dict(zip(item_ids.tolist(), group_ids.tolist()))
 
-    items = __MakeRank(item_ids, group_ids, phi)
-    for i in range(0, r_cnt - 1):
-        items_next = __MakeRank(item_ids, group_ids, phi)
-        items = np.column_stack((items, items_next))
+    items = __GenBlocks(
+        item_ids, group_ids, phi, r_cnt, seed, None, item_dtype, None, n_jobs
+    )
 
-    ranking_df = pd.DataFrame(items)
+    ranking_df = __Output(items, ragged, item_dtype)
     return ranking_df, item_group_dict
 
 
-def ScoredGenFromGroups(group_proportions, num_items, phi, r_cnt, score_dist, seed):
+def ScoredGenFromGroups(
+    group_proportions,
+    num_items,
+    phi,
+    r_cnt,
+    score_dist,
+    seed,
+    item_dtype=None,
+    score_dtype=None,
+    n_jobs=1,
+    ragged=False,
+):
     """
     RankTune method generating data from group proportions (as opposed to actual items), and random relevance scores assigned to items.
     :param group_proportions: Numpy array of group_proportions.
@@ -139,14 +252,17 @@ def ScoredGenFromGroups(group_proportions, num_items, phi, r_cnt, score_dist, se
     :param phi: Float, Representativeness in range [0,1]; where 0 is unfair and 1 is most fair and representative.
     :param r_cnt: Int, number of rankings to generate.
     :param score_dist: String, either "uniform" or "normal for generating scores.
-    :param seed: Random seed value for reproducibility.
+    :param seed: Random seed value for reproducibility, or a Numpy random Generator (or SeedSequence) owned by the caller.
+    :param item_dtype: Optional Numpy dtype for the generated item ids (e.g., np.int32 or np.uint16), default keeps the dtype of the items.
+    :param score_dtype: Optional Numpy dtype for the generated scores (e.g., np.float32), default is float64.
+    :param n_jobs: Int, number of processes generating rankings (-1 uses all CPUs), the output for a seed does not depend on n_jobs.
+    :param ragged: Bool, return the ranking(s) (and scores) as RaggedRankings instead of Pandas dataframes.
     :return: ranking_df - Pandas dataframe of generated ranking(s),  item_group_dict -  Dictionary of items (keys) and their group membership (values), scores-df - Pandas dataframe of generates scores.
     """
     __CheckDistributions(group_proportions, num_items, phi)
+    __CheckScoreDist(score_dist)
     item_ids = np.arange(0, num_items)
     group_ids = np.empty(0, dtype=int)
-    np.random.seed(seed)  # For reproducibility
-    random.seed(seed)
     for g in range(0, len(group_proportions)):
         group_ids = np.hstack(
             (group_ids, np.tile(int(g), int(num_items * group_proportions[g])))
@@ -154,81 +270,276 @@ def ScoredGenFromGroups(group_proportions, num_items, phi, r_cnt, score_dist, se
 
     # Make item_group_dict
     item_group_dict = dict(zip(item_ids.tolist(), group_ids.tolist()))
-    if score_dist == "normal":
-        scores = -np.sort(-np.random.standard_normal(size=len(item_ids)))
-        for i in range(0, r_cnt - 1):
-            scores_next = -np.sort(-np.random.standard_normal(size=len(item_ids)))
-            scores = np.column_stack((scores, scores_next))
-    elif score_dist == "uniform":
-        scores = -np.sort(-np.random.uniform(0, 1, size=len(item_ids)))
-        for i in range(0, r_cnt - 1):
-            scores_next = -np.sort(-np.random.uniform(0, 1, size=len(item_ids)))
-            scores = np.column_stack((scores, scores_next))
-    items = __MakeRank(item_ids, group_ids, phi)
-    for i in range(0, r_cnt - 1):
-        items_next = __MakeRank(item_ids, group_ids, phi)
-        items = np.column_stack((items, items_next))
-
-    ranking_df = pd.DataFrame(items)
-    scores_df = pd.DataFrame(scores)
+    items, scores = __GenBlocks(
+        item_ids,
+        group_ids,
+        phi,
+        r_cnt,
+        seed,
+        score_dist,
+        item_dtype,
+        score_dtype,
+        n_jobs,
+    )
+
+    ranking_df = __Output(items, ragged, item_dtype)
+    scores_df = __Output(scores, ragged, scores.dtype)
     return ranking_df, item_group_dict, scores_df
 
 
-def GenFromItems(item_group_dict, phi, r_cnt, seed):
+def GenFromItems(
+    item_group_dict, phi, r_cnt, seed, item_dtype=None, n_jobs=1, ragged=False
+):
     """
     RankTune method generating data from known items with group membership.
-    :param item_group_dict: Dictionary of items (keys) and their group membership (values).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
     :param num_items: Int, number of items in ranking(s).
     :param phi: Float, Representativeness in range [0,1]; where 0 is unfair and 1 is most fair and representative.
     :param r_cnt: Int, number of rankings to generate.
-    :param seed: Random seed value for reproducibility.
+    :param seed: Random seed value for reproducibility, or a Numpy random Generator (or SeedSequence) owned by the caller.
+    :param item_dtype: Optional Numpy dtype for the generated item ids (e.g., np.int32 or np.uint16), default keeps the dtype of the items.
+    :param n_jobs: Int, number of processes generating rankings (-1 uses all CPUs), the output for a seed does not depend on n_jobs.
+    :param ragged: Bool, return the ranking(s) (and scores) as RaggedRankings instead of Pandas dataframes.
     :return: ranking_df - Pandas dataframe of generated ranking(s),  item_group_dict -  Dictionary of items (keys) and their group membership (values), scores-df - Pandas dataframe of generates scores.
     """
     __CheckFull(phi)
-    item_ids = list(item_group_dict.keys())
-    group_ids = np.asarray([item_group_dict[i] for i in item_ids])
-    np.random.seed(seed)  # For reproducibility
-    random.seed(seed)
-    items = __MakeRank(np.asarray(item_ids), group_ids, phi)
-    for i in range(0, r_cnt - 1):
-        items_next = __MakeRank(np.asarray(item_ids), group_ids, phi)
-        items = np.column_stack((items, items_next))
-
-    ranking_df = pd.DataFrame(items)
+    index = GroupIndex(item_group_dict)
+    item_ids = index.items.tolist()
+    group_ids = index.groups[index.codes]
+    items = __GenBlocks(
+        np.asarray(item_ids),
+        group_ids,
+        phi,
+        r_cnt,
+        seed,
+        None,
+        item_dtype,
+        None,
+        n_jobs,
+    )
+
+    ranking_df = __Output(items, ragged, item_dtype)
     return ranking_df, item_group_dict
 
 
-def ScoredGenFromItems(item_group_dict, phi, r_cnt, score_dist, seed):
+def ScoredGenFromItems(
+    item_group_dict,
+    phi,
+    r_cnt,
+    score_dist,
+    seed,
+    item_dtype=None,
+    score_dtype=None,
+    n_jobs=1,
+    ragged=False,
+):
     """
     RankTune method generating data from known items with group membership, and random relevance scores assigned to items.
-    :param item_group_dict: Dictionary of items (keys) and their group membership (values).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
     :param num_items: Int, number of items in ranking(s).
     :param phi: Float, Representativeness in range [0,1]; where 0 is unfair and 1 is most fair and representative.
     :param r_cnt: Int, number of rankings to generate.
     :param score_dist: String, either "uniform" or "normal for generating scores.
-    :param seed: Random seed value for reproducibility.
+    :param seed: Random seed value for reproducibility, or a Numpy random Generator (or SeedSequence) owned by the caller.
+    :param item_dtype: Optional Numpy dtype for the generated item ids (e.g., np.int32 or np.uint16), default keeps the dtype of the items.
+    :param score_dtype: Optional Numpy dtype for the generated scores (e.g., np.float32), default is float64.
+    :param n_jobs: Int, number of processes generating rankings (-1 uses all CPUs), the output for a seed does not depend on n_jobs.
+    :param ragged: Bool, return the ranking(s) (and scores) as RaggedRankings instead of Pandas dataframes.
     :return: ranking_df - Pandas dataframe of generated ranking(s),  item_group_dict -  Dictionary of items (keys) and their group membership (values), scores-df - Pandas dataframe of generates scores.
     """
     __CheckFull(phi)
-    item_ids = list(item_group_dict.keys())
-    group_ids = np.asarray([item_group_dict[i] for i in item_ids])
-    np.random.seed(seed)  # For reproducibility
-    random.seed(seed)
-    if score_dist == "normal":
-        scores = -np.sort(-np.random.standard_normal(size=len(item_ids)))
-        for i in range(0, r_cnt - 1):
-            scores_next = -np.sort(-np.random.standard_normal(size=len(item_ids)))
-            scores = np.column_stack((scores, scores_next))
-    elif score_dist == "uniform":
-        scores = -np.sort(-np.random.uniform(0, 1, size=len(item_ids)))
-        for i in range(0, r_cnt - 1):
-            scores_next = -np.sort(-np.random.uniform(0, 1, size=len(item_ids)))
-            scores = np.column_stack((scores, scores_next))
-    items = __MakeRank(np.asarray(item_ids), group_ids, phi)
-    for i in range(0, r_cnt - 1):
-        items_next = __MakeRank(np.asarray(item_ids), group_ids, phi)
-        items = np.column_stack((items, items_next))
-
-    ranking_df = pd.DataFrame(items)
-    scores_df = pd.DataFrame(scores)
+    __CheckScoreDist(score_dist)
+    index = GroupIndex(item_group_dict)
+    item_ids = index.items.tolist()
+    group_ids = index.groups[index.codes]
+    items, scores = __GenBlocks(
+        np.asarray(item_ids),
+        group_ids,
+        phi,
+        r_cnt,
+        seed,
+        score_dist,
+        item_dtype,
+        score_dtype,
+        n_jobs,
+    )
+
+    ranking_df = __Output(items, ragged, item_dtype)
+    scores_df = __Output(scores, ragged, scores.dtype)
     return ranking_df, item_group_dict, scores_df
+
+
+def IterGenFromItems(
+    item_group_dict,
+    phi,
+    r_cnt,
+    seed,
+    chunk=1000,
+    score_dist=None,
+    item_dtype=None,
+    score_dtype=None,
+):
+    """
+    RankTune method streaming data generated from known items with group membership, in blocks of rankings.
+    Each block is generated from its own random stream spawned from seed, so blocks are reproducible and only one block is held in memory at a time.
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param phi: Float, Representativeness in range [0,1]; where 0 is unfair and 1 is most fair and representative.
+    :param r_cnt: Int, number of rankings to generate.
+    :param seed: Random seed value for reproducibility, or a Numpy random Generator (or SeedSequence) owned by the caller.
+    :param chunk: Int, number of rankings in each block (the last block may be smaller).
+    :param score_dist: Optional String, either "uniform" or "normal" for also generating scores.
+    :param item_dtype: Optional Numpy dtype for the generated item ids (e.g., np.int32 or np.uint16), default keeps the dtype of the items.
+    :param score_dtype: Optional Numpy dtype for the generated scores (e.g., np.float32), default is float64.
+    :return: Generator of Numpy arrays of items (items x rankings), or of (items, scores) tuples of Numpy arrays when score_dist is given.
+    """
+    __CheckFull(phi)
+    if score_dist is not None:
+        __CheckScoreDist(score_dist)
+    if chunk < 1:
+        raise ValueError("Please input chunk greater than or equal to 1")
+    index = GroupIndex(item_group_dict)
+    item_ids = __CastItems(np.asarray(index.items.tolist()), item_dtype)
+    group_ids = index.groups[index.codes]
+    return __IterBlocks(
+        item_ids,
+        group_ids,
+        phi,
+        r_cnt,
+        __SeedSequence(seed),
+        chunk,
+        score_dist,
+        item_dtype,
+        score_dtype,
+    )
+
+
+def __IterBlocks(
+    item_ids,
+    group_ids,
+    phi,
+    r_cnt,
+    seed_seq,
+    chunk,
+    score_dist,
+    item_dtype,
+    score_dtype,
+):
+    """
+    Function to lazily generate blocks of rankings, each from a random stream spawned from seed_seq.
+    :param item_ids: Numpy array of item ids.
+    :param group_ids: Numpy array of corresponding group ids.
+    :param phi: Float, Representativeness in range [0,1]; where 0 is unfair and 1 is most fair and representative.
+    :param r_cnt: Int, number of rankings to generate.
+    :param seed_seq: Numpy SeedSequence the per-block streams are spawned from.
+    :param chunk: Int, number of rankings in each block.
+    :param score_dist: None, or String, either "uniform" or "normal for generating scores.
+    :param item_dtype: Numpy dtype to store item ids with, None keeps the dtype of item_ids.
+    :param score_dtype: Numpy dtype to store scores with, None stores float64.
+    :return: Generator of blocks.
+    """
+    for start in range(0, r_cnt, chunk):
+        # spawning is deterministic in block order
+        block_seed_seq = seed_seq.spawn(1)[0]
+        yield __GenBlock(
+            item_ids,
+            group_ids,
+            phi,
+            min(chunk, r_cnt - start),
+            block_seed_seq,
+            score_dist,
+            item_dtype,
+            score_dtype,
+        )
+
+
+def __GenBlock(
+    item_ids, group_ids, phi, r_cnt, seed_seq, score_dist, item_dtype, score_dtype
+):
+    """
+    Function to generate one block of rankings (and scores) from its own random stream.
+    :param item_ids: Numpy array of item ids.
+    :param group_ids: Numpy array of corresponding group ids.
+    :param phi: Float, Representativeness in range [0,1]; where 0 is unfair and 1 is most fair and representative.
+    :param r_cnt: Int, number of rankings in the block.
+    :param seed_seq: Numpy SeedSequence of the block's random stream.
+    :param score_dist: None, or String, either "uniform" or "normal for generating scores.
+    :param item_dtype: Numpy dtype to store item ids with, None keeps the dtype of item_ids.
+    :param score_dtype: Numpy dtype to store scores with, None stores float64.
+    :return: Numpy array of items (items x rankings), or (items, scores) when score_dist is given.
+    """
+    rng = np.random.default_rng(seed_seq)
+    if score_dist is None:
+        return __MakeRanks(item_ids, group_ids, phi, r_cnt, rng, item_dtype)
+    scores = __MakeScores(len(group_ids), r_cnt, score_dist, rng, score_dtype)
+    return __MakeRanks(item_ids, group_ids, phi, r_cnt, rng, item_dtype), scores
+
+
+def __GenBlocks(
+    item_ids,
+    group_ids,
+    phi,
+    r_cnt,
+    seed,
+    score_dist,
+    item_dtype,
+    score_dtype,
+    n_jobs,
+):
+    """
+    Function to generate r_cnt rankings (and scores) in fixed size blocks, optionally spread over a process pool.
+    Block i draws from the i-th stream spawned from seed, so the result for a seed does not depend on n_jobs.
+    :param item_ids: Numpy array of item ids.
+    :param group_ids: Numpy array of corresponding group ids.
+    :param phi: Float, Representativeness in range [0,1]; where 0 is unfair and 1 is most fair and representative.
+    :param r_cnt: Int, number of rankings to generate.
+    :param seed: Random seed value for reproducibility, or a Numpy random Generator (or SeedSequence) owned by the caller.
+    :param score_dist: None, or String, either "uniform" or "normal for generating scores.
+    :param item_dtype: Numpy dtype to store item ids with, None keeps the dtype of item_ids.
+    :param score_dtype: Numpy dtype to store scores with, None stores float64.
+    :param n_jobs: Int, number of processes (-1 uses all CPUs).
+    :return: Numpy array of items (items x rankings), or (items, scores) when score_dist is given.
+    """
+    if n_jobs is None or n_jobs == 0 or n_jobs < -1:
+        raise ValueError("Please input n_jobs greater than or equal to 1, or -1")
+    item_ids = __CastItems(item_ids, item_dtype)
+    block_starts = list(range(0, r_cnt, __BLOCK_RANKINGS))
+    block_cnts = [min(__BLOCK_RANKINGS, r_cnt - start) for start in block_starts]
+    block_seed_seqs = __SeedSequence(seed).spawn(len(block_starts))
+    block_args = [
+        [item_ids] * len(block_starts),
+        [group_ids] * len(block_starts),
+        [phi] * len(block_starts),
+        block_cnts,
+        block_seed_seqs,
+        [score_dist] * len(block_starts),
+        [item_dtype] * len(block_starts),
+        [score_dtype] * len(block_starts),
+    ]
+
+    items = np.empty((len(group_ids), r_cnt), dtype=item_ids.dtype)
+    if score_dist is not None:
+        scores = np.empty((len(group_ids), r_cnt), dtype=score_dtype or np.float64)
+
+    pool = None
+    if n_jobs != 1 and len(block_starts) > 1:
+        pool = ProcessPoolExecutor(
+            max_workers=os.cpu_count() if n_jobs == -1 else n_jobs
+        )
+        blocks = pool.map(__GenBlock, *block_args)
+    else:
+        blocks = map(__GenBlock, *block_args)
+    try:
+        # blocks arrive in order and are copied straight into the preallocated output
+        for start, cnt, block in zip(block_starts, block_cnts, blocks):
+            if score_dist is None:
+                items[:, start : start + cnt] = block
+            else:
+                items[:, start : start + cnt] = block[0]
+                scores[:, start : start + cnt] = block[1]
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if score_dist is None:
+        return items
+    return items, scores
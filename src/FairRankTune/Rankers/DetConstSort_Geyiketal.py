@@ -1,7 +1,19 @@
 import numpy as np
+from FairRankTune.Data.GroupIndex import GroupIndex
+from FairRankTune.Metrics.GroupUtil import (
+    __decode_rankings,
+    __position_mask,
+    __group_codes,
+    __encode_rankings,
+)
+from FairRankTune.Rankers.RankerUtil import (
+    __map_rankings,
+    __single_ranking,
+    __single_output,
+)
+from FairRankTune.Instrumentation import __instrumented, __phase
+import heapq
 import math
-from collections import defaultdict as ddict
-
 
 # References: Geyik, S. C., Ambler, S., & Kenthapadi, K. (2019, July).
 # Fairness-aware ranking in search & recommendation systems with application to linkedin talent search.
@@ -9,118 +21,181 @@ from collections import defaultdict as ddict
 import pandas as pd
 
 
+@__instrumented
 def DETCONSTSORT(
     current_ranking_df, item_group_dict, current_ranking_scores_df, distribution, k
 ):
     """
     DetConstSort reranking algorithm.
-    :param current_ranking_df: Pandas dataframe of ranking to be reranked.
-    :param item_group_dict: Dictionary of items (keys) and their group membership (values).
-    :param current_ranking_scores_df: Pandas dataframe of relevance scores associated with each item in the ranking.
+    :param current_ranking_df: Pandas dataframe (or Numpy array) of ranking to be reranked.
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param current_ranking_scores_df: Pandas dataframe (or Numpy array) of relevance scores associated with each item in the ranking.
     :param distribution: Dictionary of group proportions (groups are keys). Ex. [.5, .5] is a fifty-fifty split.
     :param k: Int, how long the returned ranking should be.
-    :return: reranking, Pandas dataframe of items,item_group_reranked_dict, dictionary of items and group membership,  Pandas dataframe  of scores for reranking,
+    :return: reranking, Pandas dataframe of items,item_group_reranked_dict, dictionary of items and group membership,  Pandas dataframe  of scores for reranking (Numpy arrays for Numpy array input),
     """
 
     # Convert dataframes to numpy arrays
-    current_ranking = current_ranking_df[0].to_numpy()
-    current_group_ids = np.asarray([item_group_dict[i] for i in current_ranking])
-    current_ranking_scores = current_ranking_scores_df[0].to_numpy()
-
-    # score_list is <group id>  <score> and <rank> <startrank> <id>
-    score_list = [
-        (
-            current_group_ids[i],
-            current_ranking_scores[i],
-            i + 1,
-            i + 1,
-            current_ranking[i],
-        )
-        for i in range(len(current_ranking))
-    ]
+    current_ranking = __single_ranking(current_ranking_df)
+    index = GroupIndex(item_group_dict)
+    current_group_codes = index.item_codes(current_ranking)
+    current_ranking_scores = __single_ranking(current_ranking_scores_df)
 
-    unique_group_ids = list(np.unique(current_group_ids))
-    AttrScores = {}
-    num_items_per_group = {}
-    min_grp_count = {}
-    GlobalAttrCounts = {}
-    constructed_ranking_group_ids = {}  # []
-    rankedScoreList = {}  # []
-    maxIndices = {}  # []
-    last_empty_indx = 0
-    k_iter = 0
-
-    for grp_id in unique_group_ids:
-        num_items_per_group[grp_id] = 0
-        min_grp_count[grp_id] = 0
-        GlobalAttrCounts[grp_id] = sum([1 for elem in score_list if elem[0] == grp_id])
-        AttrScores[grp_id] = [
-            (item[1], item[0], item[2], item[3], item[4])
-            for item in score_list
-            if item[0] == grp_id
-        ]  # to be initialized
-
-    while last_empty_indx <= k:
-        if last_empty_indx == len(score_list):
-            break
-
-        k_iter += 1
-        temp_min_attr_count_for_curr_prefix = ddict(int)
-        changedMins = {}
-        for grp_id in unique_group_ids:
-            temp_min_attr_count_for_curr_prefix[grp_id] = math.floor(
-                k_iter * distribution[grp_id]
-            )
-            if (
-                min_grp_count[grp_id] < temp_min_attr_count_for_curr_prefix[grp_id]
-                and min_grp_count[grp_id] < GlobalAttrCounts[grp_id]
-            ):
-                changedMins[grp_id] = AttrScores[grp_id][num_items_per_group[grp_id]]
-
-        if len(changedMins) != 0:
-            ordChangedMins = sorted(
-                changedMins.items(), key=lambda x: x[1][0], reverse=True
-            )
-            for item in ordChangedMins:
-                constructed_ranking_group_ids[last_empty_indx] = item[0]
-                rankedScoreList[last_empty_indx] = item[1]
-                maxIndices[last_empty_indx] = k_iter
-                start = last_empty_indx
-                while (
-                    start > 0
-                    and maxIndices[start - 1] >= start
-                    and rankedScoreList[start - 1][0] < rankedScoreList[start][0]
-                ):
-                    __swap(rankedScoreList, start - 1, start)
-                    __swap(maxIndices, start - 1, start)
-                    __swap(constructed_ranking_group_ids, start - 1, start)
-                    start -= 1
-                num_items_per_group[item[0]] += 1
-                last_empty_indx += 1
-            min_grp_count = dict(temp_min_attr_count_for_curr_prefix)
-
-    K_items = []
-    K_scores = []
-
-    for i in range(0, k):
-        item = rankedScoreList[i]
-        K_items.append(item[4])
-        K_scores.append(item[0])
-
-    reranking = np.asarray(K_items)
-    reranking_scores = np.asarray(K_scores)
-    current_rank = list(current_ranking)
-    reranking_ids = np.asarray(
-        [current_group_ids[current_rank.index(item)] for item in reranking]
+    positions = __DetConstSortPositions(
+        current_group_codes, current_ranking_scores, index.groups, distribution, k
     )
+
+    reranking = current_ranking[positions]
+    reranking_scores = current_ranking_scores[positions]
+    reranking_ids = index.groups[current_group_codes[positions]]
     item_group_reranked_dict = dict(zip(reranking, reranking_ids))
     return (
-        pd.DataFrame(reranking),
+        __single_output(reranking, current_ranking_df),
         item_group_reranked_dict,
-        pd.DataFrame(reranking_scores),
+        __single_output(reranking_scores, current_ranking_df),
     )
 
 
+@__instrumented
+def DETCONSTSORTBatch(
+    current_ranking_df,
+    item_group_dict,
+    current_ranking_scores_df,
+    distribution,
+    k,
+    n_jobs=1,
+):
+    """
+    DetConstSort reranking algorithm applied to every ranking (column) of current_ranking_df in one call.
+    :param current_ranking_df: Pandas dataframe (or Numpy array) of rankings to be reranked (one ranking per column, NaN padded).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param current_ranking_scores_df: Pandas dataframe (or Numpy array) of relevance scores associated with each item in the rankings, aligned with current_ranking_df.
+    :param distribution: Dictionary of group proportions (groups are keys). Ex. [.5, .5] is a fifty-fifty split.
+    :param k: Int, how long the returned rankings should be.
+    :param n_jobs: Int, number of processes reranking (-1 uses all CPUs).
+    :return: reranking, Pandas dataframe of items (one reranking per column, NaN padded when a ranking has fewer than k items), item_group_reranked_dict, dictionary of items and group membership, Pandas dataframe of scores for rerankings (Numpy arrays for Numpy array input).
+    """
+    index = GroupIndex(item_group_dict)
+    items, lengths = __decode_rankings(current_ranking_df)
+    scores, _ = __decode_rankings(current_ranking_scores_df)
+    mask = __position_mask(lengths, items.shape[1])
+    codes, _, _ = __group_codes(items, mask, index)
+
+    args = [
+        (codes[r, : lengths[r]], scores[r, : lengths[r]], index.groups, distribution, k)
+        for r in range(len(lengths))
+    ]
+    reranked_positions = __map_rankings(__DetConstSortPositions, args, n_jobs)
+
+    # gather all rerankings with one fancy index, padding rerankings shorter than k
+    out_lengths = np.asarray([len(p) for p in reranked_positions], dtype=np.intp)
+    out_mask = __position_mask(out_lengths, k)
+    positions = np.zeros((len(lengths), k), dtype=np.intp)
+    positions[out_mask] = np.concatenate(reranked_positions + [np.empty(0, np.intp)])
+    rows = np.arange(len(lengths))[:, None]
+    reranking = items[rows, positions]
+    reranking_scores = scores[rows, positions]
+    reranking_ids = index.groups[codes[rows, positions][out_mask]]
+    item_group_reranked_dict = dict(zip(reranking[out_mask], reranking_ids))
+    return (
+        __encode_rankings(reranking, out_mask, current_ranking_df),
+        item_group_reranked_dict,
+        __encode_rankings(reranking_scores, out_mask, current_ranking_scores_df),
+    )
+
+
+@__phase("rerank")
+def __DetConstSortPositions(group_codes, scores, groups, distribution, k):
+    """
+    Core DetConstSort, returning the positions (in the current ranking) of the reranked items.
+    Instead of visiting every prefix length k_iter, a priority queue holds the next k_iter at which each group's
+    minimum count floor(k_iter * proportion) grows, so only prefixes where an item is placed are visited.
+    :param group_codes: Numpy array of the group code of each item in the current ranking.
+    :param scores: Numpy array of relevance scores of each item in the current ranking.
+    :param groups: Numpy array of groups (indexed by group code).
+    :param distribution: Dictionary of group proportions (groups are keys).
+    :param k: Int, how long the returned ranking should be.
+    :return: Numpy array of k positions.
+    """
+    num_items = len(group_codes)
+    present_codes, grp_count = np.unique(group_codes, return_counts=True)
+    # positions of each group's items in ranking order, group g occupies grp_start[g]:grp_start[g] + grp_count[g]
+    positions_by_grp = np.argsort(group_codes, kind="stable")
+    grp_start = np.cumsum(grp_count) - grp_count
+    proportions = [distribution[grp] for grp in groups[present_codes]]
+    scores_list = scores.tolist()
+
+    num_items_per_group = [0] * len(present_codes)
+    min_grp_count = [0] * len(present_codes)
+    heap = []  # (next k_iter at which the group's minimum count grows, group order)
+    for g in range(len(present_codes)):
+        next_k_iter = __NextKIter(0, min_grp_count[g], proportions[g])
+        if next_k_iter is not None:
+            heap.append((next_k_iter, g))
+    heapq.heapify(heap)
+
+    ranked_positions = []
+    ranked_scores = []
+    maxIndices = []
+    while heap and len(ranked_positions) <= k and len(ranked_positions) != num_items:
+        k_iter = heap[0][0]
+        changed = []
+        while heap and heap[0][0] == k_iter:
+            changed.append(heapq.heappop(heap)[1])
+        changed.sort()  # ties keep the order of the unique groups
+
+        changedMins = []
+        for g in changed:
+            min_grp_count[g] = math.floor(k_iter * proportions[g])
+            pos = positions_by_grp[grp_start[g] + num_items_per_group[g]]
+            changedMins.append((scores_list[pos], pos))
+            num_items_per_group[g] += 1
+            if min_grp_count[g] < grp_count[g]:
+                next_k_iter = __NextKIter(k_iter, min_grp_count[g], proportions[g])
+                if next_k_iter is not None:
+                    heapq.heappush(heap, (next_k_iter, g))
+
+        for score, pos in sorted(changedMins, key=lambda x: x[0], reverse=True):
+            ranked_positions.append(pos)
+            ranked_scores.append(score)
+            maxIndices.append(k_iter)
+            start = len(ranked_positions) - 1
+            # move the item up while the item above may still move down and scores lower
+            while (
+                start > 0
+                and maxIndices[start - 1] >= start
+                and ranked_scores[start - 1] < ranked_scores[start]
+            ):
+                __swap(ranked_positions, start - 1, start)
+                __swap(ranked_scores, start - 1, start)
+                __swap(maxIndices, start - 1, start)
+                start -= 1
+
+    return np.asarray(ranked_positions[:k], dtype=np.intp)
+
+
+def __NextKIter(k_iter, min_count, proportion):
+    """
+    Find the first prefix length after k_iter at which a group's minimum count exceeds min_count.
+    :param k_iter: Int, current prefix length.
+    :param min_count: Int, the group's current minimum count.
+    :param proportion: Float, the group's proportion.
+    :return: Int, or None if the minimum count never grows.
+    """
+    if not proportion > 0:
+        return None
+    next_k_iter = max(k_iter + 1, math.ceil((min_count + 1) / proportion))
+    # correct for floating point error so the result agrees with math.floor(k_iter * proportion)
+    while (
+        next_k_iter - 1 > k_iter
+        and math.floor((next_k_iter - 1) * proportion) > min_count
+    ):
+        next_k_iter -= 1
+    while math.floor(next_k_iter * proportion) <= min_count:
+        next_k_iter += 1
+    return next_k_iter
+
+
 def __swap(temp_list, pos_i, pos_j):
     temp = temp_list[pos_i]
     temp_list[pos_i] = temp_list[pos_j]
@@ -1,57 +1,120 @@
 import numpy as np
-import copy
+from FairRankTune.Data.GroupIndex import GroupIndex
+from FairRankTune.Metrics.GroupUtil import (
+    __decode_rankings,
+    __position_mask,
+    __group_codes,
+    __encode_rankings,
+)
+from FairRankTune.Rankers.RankerUtil import __single_ranking, __single_output
 import pandas as pd
+from FairRankTune.Instrumentation import __instrumented, __phase
 
 # References: Feng, Y., & Shah, C. (2022, June).
 # Has CEO gender bias really been fixed? adversarial attacking and improving gender fairness in image search.
 # In Proceedings of the AAAI Conference on Artificial Intelligence (Vol. 36, No. 11, pp. 11882-11890).
 
 
+@__instrumented
 def EPSILONGREEDY(
     current_ranking_df, item_group_dict, current_ranking_scores_df, epsilon, seed
 ):
     """
     Epsilon-Greedy reranking algorithm.
-    :param current_ranking_df: Pandas dataframe of ranking to be reranked.
-    :param item_group_dict: Dictionary of items (keys) and their group membership (values).
-    :param current_ranking_scores_df: Pandas dataframe of relevance scores associated with each item in the ranking.
+    :param current_ranking_df: Pandas dataframe (or Numpy array) of ranking to be reranked.
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param current_ranking_scores_df: Pandas dataframe (or Numpy array) of relevance scores associated with each item in the ranking.
     :param epsilon: Float epsilon value in [0,1].
-    :param seed: Random seed value for reproducibility.
-    :return: reranking, Pandas dataframe of items,item_group_reranked_dict, dictionary of items and group membership,  Pandas dataframe  of scores for reranking,
+    :param seed: Random seed value for reproducibility, or a Numpy random Generator owned by the caller. The swaps are drawn from a local Generator rather than the global Numpy random state, so an int seed gives different rerankings than releases up to FairRankTune 0.0.7 did.
+    :return: reranking, Pandas dataframe of items,item_group_reranked_dict, dictionary of items and group membership,  Pandas dataframe  of scores for reranking (Numpy arrays for Numpy array input),
     """
 
     # Convert dataframes to numpy arrays
-    current_ranking = current_ranking_df[0].to_numpy()
-    current_group_ids = np.asarray([item_group_dict[i] for i in current_ranking])
-    current_ranking_scores = current_ranking_scores_df[0].to_numpy()
-
-    ranking = list(current_ranking)
-    curr_ranking = copy.deepcopy(ranking)
-    np.random.seed(seed)  # for reproducibility
-    reranking = []
-    for i in range(len(curr_ranking)):
-        p = np.random.rand()
-        if (
-            p <= epsilon and i < len(curr_ranking) - 1
-        ):  # swap items & can't swap last item
-            temp = curr_ranking[i]
-            j = np.random.randint(i + 1, len(curr_ranking))
-            curr_ranking[i] = curr_ranking[j]
-            curr_ranking[j] = temp
-            reranking.append(curr_ranking[i])
-        else:  # keep original ranking
-            reranking.append(curr_ranking[i])
-
-    reranking = np.asarray(reranking)
-    reranking_scores = np.asarray(
-        [current_ranking_scores[ranking.index(item)] for item in reranking]
-    )
-    reranking_ids = np.asarray(
-        [current_group_ids[ranking.index(item)] for item in reranking]
-    )
+    current_ranking = __single_ranking(current_ranking_df)
+    index = GroupIndex(item_group_dict)
+    current_group_codes = index.item_codes(current_ranking)
+    current_ranking_scores = __single_ranking(current_ranking_scores_df)
+
+    rng = np.random.default_rng(seed)  # local to this call, for reproducibility
+    perm = __EpsilonGreedyPermutations(
+        np.asarray([len(current_ranking)]), epsilon, rng
+    )[0]
+
+    reranking = current_ranking[perm]
+    reranking_scores = current_ranking_scores[perm]
+    reranking_ids = index.groups[current_group_codes[perm]]
     item_group_reranked_dict = dict(zip(reranking, reranking_ids))
     return (
-        pd.DataFrame(reranking),
+        __single_output(reranking, current_ranking_df),
         item_group_reranked_dict,
-        pd.DataFrame(reranking_scores),
+        __single_output(reranking_scores, current_ranking_df),
     )
+
+
+@__instrumented
+def EPSILONGREEDYBatch(
+    current_ranking_df, item_group_dict, current_ranking_scores_df, epsilon, seed
+):
+    """
+    Epsilon-Greedy reranking algorithm applied to every ranking (column) of current_ranking_df in one call.
+    :param current_ranking_df: Pandas dataframe (or Numpy array) of rankings to be reranked (one ranking per column, NaN padded).
+    :param item_group_dict: Dictionary of items (keys) and their group membership (values), or a GroupIndex.
+    :param current_ranking_scores_df: Pandas dataframe (or Numpy array) of relevance scores associated with each item in the rankings, aligned with current_ranking_df.
+    :param epsilon: Float epsilon value in [0,1].
+    :param seed: Random seed value for reproducibility, or a Numpy random Generator owned by the caller. The swaps are drawn from a local Generator rather than the global Numpy random state, so an int seed gives different rerankings than releases up to FairRankTune 0.0.7 did.
+    :return: reranking, Pandas dataframe of items (one reranking per column, NaN padded), item_group_reranked_dict, dictionary of items and group membership, Pandas dataframe of scores for rerankings (Numpy arrays for Numpy array input).
+    """
+    index = GroupIndex(item_group_dict)
+    items, lengths = __decode_rankings(current_ranking_df)
+    scores, _ = __decode_rankings(current_ranking_scores_df)
+    mask = __position_mask(lengths, items.shape[1])
+    codes, _, _ = __group_codes(items, mask, index)
+
+    rng = np.random.default_rng(seed)  # local to this call, for reproducibility
+    perm = __EpsilonGreedyPermutations(lengths, epsilon, rng)
+
+    rows = np.arange(len(lengths))[:, None]
+    reranking = items[rows, perm]
+    reranking_scores = scores[rows, perm]
+    reranking_ids = index.groups[codes[rows, perm][mask]]
+    item_group_reranked_dict = dict(zip(reranking[mask], reranking_ids))
+    return (
+        __encode_rankings(reranking, mask, current_ranking_df),
+        item_group_reranked_dict,
+        __encode_rankings(reranking_scores, mask, current_ranking_scores_df),
+    )
+
+
+@__phase("rerank")
+def __EpsilonGreedyPermutations(lengths, epsilon, rng):
+    """
+    Draw the Epsilon-Greedy swaps of several rankings at once and apply them to position arrays.
+    :param lengths: Numpy array of ranking lengths.
+    :param epsilon: Float epsilon value in [0,1].
+    :param rng: Numpy random Generator.
+    :return: Numpy array (rankings x positions) of the original position of the item placed at each position, positions past a ranking's end are left in place.
+    """
+    num_positions = lengths.max(initial=0)
+    positions = np.arange(num_positions)
+    # swap coins and targets are drawn up front, the last item of a ranking can't swap
+    coins = rng.random((len(lengths), num_positions))
+    swap = (coins <= epsilon) & (positions[None, :] < lengths[:, None] - 1)
+    targets = rng.integers(
+        positions[None, :] + 1,
+        np.maximum(lengths[:, None], positions[None, :] + 2),
+    )
+
+    perm = np.tile(positions, (len(lengths), 1))
+    if len(lengths) == 1:  # swaps of a single ranking are cheapest on a list
+        perm_list = perm[0].tolist()
+        swap_positions = np.flatnonzero(swap[0])
+        for i, j in zip(swap_positions.tolist(), targets[0, swap_positions].tolist()):
+            perm_list[i], perm_list[j] = perm_list[j], perm_list[i]
+        perm[0] = perm_list
+        return perm
+    # position by position, swap in every ranking whose coin came up at once
+    for i in np.flatnonzero(swap.any(axis=0)):
+        swap_rows = np.flatnonzero(swap[:, i])
+        j = targets[swap_rows, i]
+        perm[swap_rows, i], perm[swap_rows, j] = perm[swap_rows, j], perm[swap_rows, i]
+    return perm
@@ -0,0 +1,65 @@
+# Script containing methods shared by the rankers to rerank many rankings in one call.
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from FairRankTune.Data.RaggedRankings import RaggedRankings
+from FairRankTune.Instrumentation import __phase
+
+
+def __check_n_jobs(n_jobs):
+    """
+    Function to error check n_jobs parameter.
+    :param n_jobs: Int, number of processes (-1 uses all CPUs).
+    :return: Raise error if appropriate.
+    """
+    if n_jobs is None or n_jobs == 0 or n_jobs < -1:
+        raise ValueError("Please input n_jobs greater than or equal to 1, or -1")
+
+
+def __map_rankings(fn, args, n_jobs):
+    """
+    Apply fn to the arguments of every ranking, optionally across a process pool, keeping the order of the rankings.
+    :param fn: Module level function reranking one ranking.
+    :param args: List of argument tuples, one per ranking.
+    :param n_jobs: Int, number of processes (-1 uses all CPUs).
+    :return: List of results, one per ranking.
+    """
+    __check_n_jobs(n_jobs)
+    if n_jobs == 1 or len(args) <= 1:
+        return [fn(*a) for a in args]
+    max_workers = os.cpu_count() if n_jobs == -1 else n_jobs
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        # hand each worker a few large chunks of rankings instead of one ranking at a time
+        chunksize = max(1, len(args) // (4 * max_workers))
+        return list(pool.map(fn, *zip(*args), chunksize=chunksize))
+
+
+@__phase("decode")
+def __single_ranking(ranking_df):
+    """
+    Extract the ranking to be reranked as a Numpy array.
+    :param ranking_df: Pandas dataframe of ranking (column 0 is used), Numpy array of the ranking (1-D, or the first column of a 2-D array), or RaggedRankings (ranking 0 is used).
+    :return: Numpy array.
+    """
+    if isinstance(ranking_df, pd.DataFrame):
+        return ranking_df[0].to_numpy()
+    if isinstance(ranking_df, RaggedRankings):
+        return ranking_df[0]
+    ranking = np.asarray(ranking_df)
+    return ranking if ranking.ndim == 1 else ranking[:, 0]
+
+
+@__phase("encode")
+def __single_output(values, like):
+    """
+    Return a reranking (or its scores) in the type of the input it was reranked from.
+    :param values: Numpy array.
+    :param like: Pandas dataframe, Numpy array, or RaggedRankings the ranking was read from.
+    :return: Pandas dataframe or RaggedRankings matching like, else values.
+    """
+    if isinstance(like, pd.DataFrame):
+        return pd.DataFrame(values)
+    if isinstance(like, RaggedRankings):
+        return RaggedRankings(values, [0, len(values)])
+    return values
@@ -1,3 +1,5 @@
+from FairRankTune.Data import *
 from FairRankTune.RankTune import *
 from FairRankTune.Metrics import *
-from FairRankTune.Rankers import *
\ No newline at end of file
+from FairRankTune.Rankers import *
+from FairRankTune.Instrumentation import *
@@ -0,0 +1,31 @@
+import numpy as np
+import FairRankTune as frt
+
+
+def test_ragged_output_is_int32():
+    item_group_dict = {i: i % 3 for i in range(50)}
+    ranking, _ = frt.RankTune.GenFromItems(item_group_dict, 0.5, 4, 1, ragged=True)
+    assert ranking.items.dtype == np.int32
+    ranking, _, scores = frt.RankTune.ScoredGenFromGroups(
+        np.asarray([0.5, 0.5]), 50, 0.5, 4, "uniform", 1, ragged=True
+    )
+    assert ranking.items.dtype == np.int32
+    assert scores.items.dtype == np.float64
+
+
+def test_seed_sequence_is_reusable():
+    item_group_dict = {i: i % 3 for i in range(50)}
+    seed = np.random.SeedSequence(7)
+    first, _ = frt.RankTune.GenFromItems(item_group_dict, 0.5, 150, seed)
+    second, _ = frt.RankTune.GenFromItems(item_group_dict, 0.5, 150, seed)
+    assert first.equals(second)
+    blocks = [
+        np.concatenate(
+            list(
+                frt.RankTune.IterGenFromItems(item_group_dict, 0.5, 30, seed, chunk=10)
+            ),
+            axis=1,
+        )
+        for _ in range(2)
+    ]
+    assert np.array_equal(blocks[0], blocks[1])